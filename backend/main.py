@@ -1,76 +1,233 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
-from backend.services.data_fetcher import get_yahoo_finance_data, get_market_sentiment_data, get_news_data, get_fred_data
-from backend.services.scoring_engine import get_score_and_explanation, train_technical_model, engineer_features
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from backend.services.config import BATCH_MAX_TICKERS, WARMUP_TICKERS, SCORE_RESULT_TTL_SECONDS, SCORE_RESULT_CACHE_SIZE, SNAPSHOT_DB_PATH, SNAPSHOT_MAX_AGE_SECONDS, SCREEN_MAX_LIMIT
+from backend.services.data_fetcher import fetch_score_inputs, fetch_ticker_inputs_batch, fetch_market_inputs, prefetch_price_histories, run_blocking
+from backend.services.scoring_engine import get_score_and_explanation, train_technical_model_isolated, engineer_features, get_model_path, score_batch, warm_up
+from backend.services.training_jobs import training_jobs, retrain_scheduler
+from backend.services.cache import AsyncSingleFlight
+from backend.services.serialization import render_response, RESPONSE_FORMATS, dumps, shape_frame, build_score_payload
+from backend.services.snapshot_store import SnapshotStore, SCREEN_COLUMNS
+from backend.services.metrics import registry as metrics_registry, CONTENT_TYPE as METRICS_CONTENT_TYPE, http_request_seconds, time_stage
+import asyncio
+from contextlib import asynccontextmanager
 import logging
+import time
+from datetime import datetime, timezone
 import pandas as pd
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-app = FastAPI(title="CredTech AI API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warms the sentiment analyzer and hot models before the app reports ready."""
+    try: await run_in_threadpool(warm_up, WARMUP_TICKERS)
+    except Exception as e: logging.error(f"Warm-up failed, models will load on first use: {e}")
+    yield
+
+app = FastAPI(title="CredTech AI API", version="1.0.0", lifespan=lifespan)
+# Only successful (status, payload) results are reused; errors such as upstream timeouts are retried by the next request.
+score_requests = AsyncSingleFlight(maxsize=SCORE_RESULT_CACHE_SIZE, ttl=SCORE_RESULT_TTL_SECONDS, name="score_results", cache_if=lambda result: result[0] == 200)
+snapshot_store = SnapshotStore(SNAPSHOT_DB_PATH) if SNAPSHOT_DB_PATH else None
+
+def freshness(source: str, scored_at: float, data_date: str = None) -> dict:
+    """Tells clients whether a score is live or from a snapshot, when it was computed and through which bar."""
+    return {"source": source, "scored_at": datetime.fromtimestamp(scored_at, timezone.utc).isoformat(timespec='seconds'), "data_date": data_date}
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Times every request by route template (not raw path, so ticker symbols don't explode label cardinality).
+
+    Streaming responses are timed to their first byte; the batch body keeps streaming after this returns.
+    """
+    start = time.perf_counter(); status = 500
+    try:
+        response = await call_next(request); status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        http_request_seconds.observe(time.perf_counter() - start, route=route.path if route is not None else "unmatched", method=request.method, status=status)
 
 def retrain_model_background(ticker: str):
     """Handles the background task for retraining the ML model."""
     logging.info(f"[BACKGROUND] Starting retraining process for {ticker}...")
     try:
-        yf_data = get_yahoo_finance_data(ticker)
+        # No request is waiting, so only the per-source timeouts apply.
+        inputs = asyncio.run(fetch_score_inputs(ticker, deadline=0))
+        yf_data = inputs["yf_data"]
         if not yf_data:
             logging.error(f"[BACKGROUND] Failed to fetch yfinance data for {ticker}. Aborting."); return
         
-        company_name = yf_data["info"].get("longName", ticker)
-        market_sentiment = get_market_sentiment_data()
-        fred_data = get_fred_data()
+        market_sentiment = inputs["market_sentiment"]
+        fred_data = inputs["fred_data"]
         fred_data = fred_data if fred_data is not None else pd.Series(dtype='float64')
-        news_data = get_news_data(query=company_name)
+        news_data = inputs["news_data"]
         
         all_features = engineer_features(yf_data, market_sentiment, fred_data, news_data or [])
         
         if not all_features.empty:
-            train_technical_model(all_features, ticker)
+            model_path = train_technical_model_isolated(all_features, ticker)
             logging.info(f"[BACKGROUND] Retraining for {ticker} completed successfully.")
+            return model_path
         else:
             logging.warning(f"[BACKGROUND] Not enough data to retrain model for {ticker}.")
     except Exception as e:
         logging.error(f"[BACKGROUND] An error occurred during retraining for {ticker}: {e}")
 
-@app.get("/api/v1/score/{ticker}")
-async def get_credit_score(ticker: str, background_tasks: BackgroundTasks):
-    """Analyzes a stock ticker and returns its creditworthiness score."""
-    logging.info(f"Received request for ticker: {ticker.upper()}")
-    
+async def score_ticker(ticker: str):
+    """Fetches a ticker's inputs and scores it; returns (status_code, payload) before per-client shaping and encoding."""
     try:
-        yf_data = get_yahoo_finance_data(ticker)
+        with time_stage("fetch_inputs"): inputs = await fetch_score_inputs(ticker)
+        yf_data = inputs["yf_data"]
+        if "yf_data" in inputs["degraded"]:
+            logging.warning(f"Price data for {ticker} missed its fetch deadline.")
+            return 504, {"error": True, "type": "UPSTREAM_TIMEOUT"}
         
         # FINAL, SIMPLIFIED CHECK: If there's no basic info or price history, the ticker is invalid.
         if not yf_data or not yf_data.get("info") or yf_data.get("historical_data") is None:
             logging.warning(f"Invalid ticker or not enough data returned for {ticker}.")
-            return JSONResponse(status_code=404, content={"error": True, "type": "INVALID_TICKER"})
+            return 404, {"error": True, "type": "INVALID_TICKER"}
 
         # If the check passes, we have a valid ticker, so we proceed.
-        company_info = yf_data.get("info", {})
-        company_name = company_info.get("longName", ticker)
-        market_sentiment = get_market_sentiment_data()
-        fred_data = get_fred_data()
+        market_sentiment = inputs["market_sentiment"]
+        fred_data = inputs["fred_data"]
         fred_data = fred_data if fred_data is not None else pd.Series(dtype='float64')
-        news_data = get_news_data(query=company_name)
+        news_data = inputs["news_data"]
+        degraded_inputs = inputs["degraded"]
 
     except Exception as e:
         logging.error(f"Data fetching failed: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch initial data.")
 
-    result = get_score_and_explanation(
+    # Feature engineering, inference and SHAP are CPU-bound; keep them off the event loop too.
+    result = await run_in_threadpool(
+        get_score_and_explanation,
         ticker=ticker, yf_data=yf_data,
         market_sentiment=market_sentiment,
         fred_data=fred_data,
         news_data=news_data or []
     )
     
+    if result.get("training_job"):
+        result["training_job"]["status_url"] = f"/api/v1/jobs/{result['training_job']['job_id']}"
+
+    data_date = max(yf_data["historical_data"]) if yf_data.get("historical_data") else None
+    payload = {**build_score_payload(ticker, yf_data, result, news_data, degraded_inputs), "freshness": freshness("live", time.time(), data_date)}
     if "error" in result or result.get('assessment_type') == 'Heuristic':
         logging.warning(f"Returning known error or heuristic to frontend.")
-        return {"ticker": ticker.upper(), "company_name": company_name, "company_info": company_info, "score_result": result, "stock_history": yf_data.get("historical_data"), "recent_news_for_context": news_data[:5] if news_data else []}
+        return 200, payload
     
-    background_tasks.add_task(retrain_model_background, ticker)
-    logging.info(f"Scheduled background retraining for {ticker}.")
-    return {"ticker": ticker.upper(), "company_name": company_name, "company_info": company_info, "score_result": result, "stock_history": yf_data.get("historical_data"), "recent_news_for_context": news_data[:5] if news_data else []}
+    # The pooled model is retrained offline (src/train_global_model.py), never per request.
+    if result.get("model_scope") == "ticker" and retrain_scheduler.maybe_schedule(ticker, get_model_path(ticker), data_date, retrain_model_background, ticker):
+        logging.info(f"Scheduled background retraining for {ticker}.")
+    return 200, payload
+
+@app.get("/api/v1/score/{ticker}")
+async def get_credit_score(request: Request, ticker: str, fields: str = None, response_format: str = Query("index", alias="format"), live: bool = False):
+    """Analyzes a stock ticker and returns its creditworthiness score.
+
+    `fields` selects or drops payload fields (e.g. "-score_result.all_features") and `format=columnar`
+    returns the date-keyed tables as column arrays. Tickers in the nightly snapshot are served from
+    it unless `live=true`; `freshness` says which. Concurrent live requests for the same ticker share
+    one fetch-and-score run, whose result is reused for SCORE_RESULT_TTL_SECONDS.
+    """
+    if response_format not in RESPONSE_FORMATS:
+        return JSONResponse(status_code=400, content={"error": True, "type": "INVALID_FORMAT"})
+    ticker = ticker.upper()
+    logging.info(f"Received request for ticker: {ticker}")
+    if not live and snapshot_store is not None:
+        snapshot = await run_in_threadpool(snapshot_store.get, ticker, SNAPSHOT_MAX_AGE_SECONDS)
+        if snapshot is not None:
+            payload = {**snapshot["payload"], "freshness": freshness("snapshot", snapshot["scored_at"], snapshot["data_date"])}
+            return render_response(payload, request.headers.get("accept-encoding", ""), fields, response_format)
+    status_code, payload = await score_requests.run(ticker, lambda: score_ticker(ticker))
+    if status_code != 200: return JSONResponse(status_code=status_code, content=payload)
+    return render_response(payload, request.headers.get("accept-encoding", ""), fields, response_format)
+
+class BatchScoreRequest(BaseModel):
+    tickers: list[str]
+    include_features: bool = False
+
+async def stream_batch_scores(tickers: list, include_features: bool):
+    """Yields one NDJSON line per ticker, scoring whichever tickers finished fetching together."""
+    market_sentiment, fred_data, market_degraded = await fetch_market_inputs()
+    fred_data = fred_data if fred_data is not None else pd.Series(dtype='float64')
+    await run_blocking(prefetch_price_histories, tickers, pool="batch")
+    pending = fetch_ticker_inputs_batch(tickers)
+    while pending:
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        ready, news_by_ticker, degraded_by_ticker = {}, {}, {}
+        for task in done:
+            ticker = pending.pop(task)
+            try: yf_data, news_data, degraded = task.result()
+            except Exception as e:
+                logging.error(f"Data fetching failed for {ticker}: {e}"); yf_data, news_data, degraded = None, None, []
+            if "yf_data" in degraded:
+                yield dumps({"ticker": ticker, "error": True, "type": "UPSTREAM_TIMEOUT"}) + b"\n"; continue
+            degraded_by_ticker[ticker] = market_degraded + degraded
+            if not yf_data or not yf_data.get("info") or not yf_data.get("historical_data"):
+                yield dumps({"ticker": ticker, "error": True, "type": "INVALID_TICKER"}) + b"\n"; continue
+            ready[ticker], news_by_ticker[ticker] = yf_data, news_data or []
+        if not ready: continue
+        results = await run_in_threadpool(score_batch, ready, market_sentiment, fred_data, news_by_ticker, include_features)
+        for ticker, result in results.items():
+            if result.get("model_scope") == "ticker":
+                retrain_scheduler.maybe_schedule(ticker, get_model_path(ticker), max(ready[ticker]["historical_data"]), retrain_model_background, ticker)
+            if "all_features" in result: result["all_features"] = shape_frame(result["all_features"], "columnar")
+            yield dumps({"ticker": ticker, "company_name": ready[ticker]["info"].get("longName", ticker), "score_result": result, "degraded_inputs": degraded_by_ticker[ticker]}) + b"\n"
+
+@app.post("/api/v1/score/batch")
+async def get_batch_credit_scores(body: BatchScoreRequest):
+    """Scores a list of tickers, streaming one NDJSON result line per ticker as each completes."""
+    tickers = list(dict.fromkeys(ticker.strip().upper() for ticker in body.tickers if ticker.strip()))
+    if not tickers or len(tickers) > BATCH_MAX_TICKERS:
+        return JSONResponse(status_code=400, content={"error": True, "type": "INVALID_BATCH", "max_tickers": BATCH_MAX_TICKERS})
+    logging.info(f"Received batch request for {len(tickers)} tickers.")
+    return StreamingResponse(stream_batch_scores(tickers, body.include_features), media_type="application/x-ndjson")
+
+@app.get("/api/v1/jobs/{job_id}")
+def get_training_job(job_id: str):
+    """Returns the status of a background model training job."""
+    job = training_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": True, "type": "JOB_NOT_FOUND"})
+    return job
+
+@app.get("/api/v1/screen")
+def screen_universe(request: Request, sector: str = None, sort: str = "stability_score", limit: int = 50, offset: int = 0):
+    """Screens the snapshot universe, e.g. ?sector=Technology&stability_score_max=50&debt_to_equity_min=150&sort=-stability_score.
+
+    Every screening column (score components, risk_probability, market_cap and the engineered
+    features) takes `<column>_min` / `<column>_max` bounds; `sector` takes a comma-separated list
+    and a leading "-" sorts descending. Only the snapshot store is read, never upstream providers.
+    """
+    if snapshot_store is None:
+        return JSONResponse(status_code=503, content={"error": True, "type": "SNAPSHOTS_DISABLED"})
+    ranges = {}
+    for name, value in request.query_params.items():
+        if name in ("sector", "sort", "limit", "offset"): continue
+        column, _, bound = name.rpartition("_")
+        try: number = float(value)
+        except ValueError: number = None
+        if bound not in ("min", "max") or column not in SCREEN_COLUMNS or number is None:
+            return JSONResponse(status_code=400, content={"error": True, "type": "INVALID_FILTER", "filter": name})
+        low, high = ranges.get(column, (None, None))
+        ranges[column] = (number, high) if bound == "min" else (low, number)
+    descending, sort = sort.startswith("-"), sort.lstrip("-")
+    if sort not in SCREEN_COLUMNS and sort != "ticker":
+        return JSONResponse(status_code=400, content={"error": True, "type": "INVALID_SORT"})
+    if not 1 <= limit <= SCREEN_MAX_LIMIT or offset < 0:
+        return JSONResponse(status_code=400, content={"error": True, "type": "INVALID_PAGE", "max_limit": SCREEN_MAX_LIMIT})
+    sectors = [name.strip() for name in sector.split(",") if name.strip()] if sector else None
+    with time_stage("screen"): total, rows = snapshot_store.screen(sectors, ranges, sort, descending, limit, offset, SNAPSHOT_MAX_AGE_SECONDS)
+    for row in rows: row["scored_at"] = datetime.fromtimestamp(row["scored_at"], timezone.utc).isoformat(timespec='seconds')
+    return render_response({"total": total, "offset": offset, "limit": limit, "results": rows}, request.headers.get("accept-encoding", ""))
+
+@app.get("/metrics")
+def get_metrics():
+    """Exposes latency histograms, cache, model-load and training-job metrics in the Prometheus text format."""
+    return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
 
 @app.get("/")
 def read_root():
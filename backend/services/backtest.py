@@ -0,0 +1,130 @@
+# backend/services/backtest.py
+
+import os
+import json
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from xgboost import XGBClassifier
+from .config import TRAINING_THREADS_PER_JOB
+from .training_jobs import _init_training_process
+from .scoring_engine import add_risk_target, add_profile_features, get_fundamental_score, TECHNICAL_FEATURE_COLUMNS, GLOBAL_FEATURE_COLUMNS
+
+BACKTEST_SCOPES = ("ticker", "global")
+# Fixed parameters (the tuned values reported in results/metrics.json): re-running Optuna in every window would dominate the run time.
+DEFAULT_PARAMS = {'n_estimators': 250, 'max_depth': 5, 'learning_rate': 0.05, 'subsample': 0.8, 'colsample_bytree': 0.8}
+
+def walk_forward_windows(dates, train_window: int = 504, step: int = 21, min_train: int = 252):
+    """Yields (train_start, train_end, score_end) for a walk-forward pass over sorted trading dates.
+
+    Each model trains on the `train_window` bars up to train_end (all earlier bars if 0) and scores
+    the `step` bars after it, up to score_end. The first window needs `min_train` bars of history.
+    """
+    dates = pd.DatetimeIndex(sorted(set(dates)))
+    for i in range(max(min_train, 1) - 1, len(dates) - 1, step):
+        yield dates[max(0, i - train_window + 1) if train_window else 0], dates[i], dates[min(i + step, len(dates) - 1)]
+
+def window_training_set(features: pd.DataFrame, start, end) -> pd.DataFrame:
+    """Labels one ticker's rows in [start, end] with the risk target, seeing no bar after `end`.
+
+    The target looks 30 bars ahead, so the last 30 rows of the window have no label and are dropped,
+    exactly as a model trained on `end` could not have known their outcome.
+    """
+    return add_risk_target(features.loc[start:end].copy())
+
+def fit_and_score_window(X_train: pd.DataFrame, y_train: pd.Series, X_score: pd.DataFrame, params: dict) -> np.ndarray:
+    """Fits one window's model and returns the risk probabilities of its scoring rows (training-process entry point)."""
+    positives = (y_train == 1).sum()
+    model = XGBClassifier(objective='binary:logistic', eval_metric='logloss', scale_pos_weight=(y_train == 0).sum() / positives if positives else 1, n_jobs=TRAINING_THREADS_PER_JOB, **params)
+    model.fit(X_train, y_train)
+    return model.predict_proba(X_score)[:, 1]
+
+def build_window_tasks(panel: pd.DataFrame, info_by_ticker: dict, scope: str, train_window: int, step: int, min_train: int):
+    """Slices the cached feature panel into (window_end, X_train, y_train, X_score) tasks.
+
+    "ticker" walks each ticker's own history with its own models; "global" trains one pooled
+    model per window on every ticker's rows, as train_global_model does.
+    """
+    tasks = []
+    if scope == "ticker":
+        for ticker in panel.index.get_level_values('ticker').unique():
+            features = panel.xs(ticker)
+            for start, end, score_end in walk_forward_windows(features.index, train_window, step, min_train):
+                train = window_training_set(features, start, end)
+                if len(train) < 100 or train['target'].nunique() < 2: continue
+                score_rows = features.loc[(features.index > end) & (features.index <= score_end), TECHNICAL_FEATURE_COLUMNS]
+                tasks.append((end, train[TECHNICAL_FEATURE_COLUMNS], train['target'], pd.concat({ticker: score_rows}, names=['ticker', 'date'])))
+        return tasks
+    by_ticker = {ticker: panel.xs(ticker) for ticker in panel.index.get_level_values('ticker').unique()}
+    profiled = add_profile_features(panel, info_by_ticker)
+    dates = panel.index.get_level_values('date')
+    for start, end, score_end in walk_forward_windows(dates, train_window, step, min_train):
+        train = pd.concat({ticker: window_training_set(features, start, end) for ticker, features in by_ticker.items()}, names=['ticker', 'date'])
+        if len(train) < 100 or train['target'].nunique() < 2: continue
+        train = add_profile_features(train, info_by_ticker)
+        tasks.append((end, train[GLOBAL_FEATURE_COLUMNS], train['target'], profiled.loc[(dates > end) & (dates <= score_end), GLOBAL_FEATURE_COLUMNS]))
+    return tasks
+
+def realized_targets(panel: pd.DataFrame) -> pd.Series:
+    """The risk target each (ticker, date) actually went on to realize; NaN where the 30-bar outcome is not known yet."""
+    labelled = pd.concat({ticker: add_risk_target(panel.xs(ticker).copy())['target'] for ticker in panel.index.get_level_values('ticker').unique()}, names=['ticker', 'date'])
+    return labelled.reindex(panel.index)
+
+def run_backtest(panel: pd.DataFrame, info_by_ticker: dict = None, scope: str = "ticker", train_window: int = 504, step: int = 21, min_train: int = 252, params: dict = None, workers: int = None) -> pd.DataFrame:
+    """Walk-forward backtest over a (ticker, date) feature panel from engineer_features_panel.
+
+    Features are engineered once for the whole history and sliced per window; windows are
+    independent, so their fits run in parallel in a spawned process pool (inline if `workers` is 1).
+    Returns out-of-sample scores for every scored (ticker, date): risk_probability, technical_score,
+    stability_score and the realized target. News, fundamentals and market sentiment are today's
+    values broadcast over history, as in engineer_features, so the stability score's fundamental
+    part is not point-in-time.
+    """
+    if scope not in BACKTEST_SCOPES: raise ValueError(f"Unknown backtest scope '{scope}'; expected one of {BACKTEST_SCOPES}.")
+    info_by_ticker, params = info_by_ticker or {}, {**DEFAULT_PARAMS, **(params or {})}
+    tasks = build_window_tasks(panel, info_by_ticker, scope, train_window, step, min_train)
+    logging.info(f"Backtesting {len(tasks)} {scope} windows over {panel.index.get_level_values('ticker').nunique()} tickers.")
+    if not tasks: return pd.DataFrame(columns=['window_end', 'risk_probability', 'technical_score', 'stability_score', 'realized_target'])
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        probabilities = [fit_and_score_window(X_train, y_train, X_score, params) for _, X_train, y_train, X_score in tasks]
+    else:
+        # spawn, not fork, for the same reason as the training pool: forking a threaded process can deadlock.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_training_process, initargs=(TRAINING_THREADS_PER_JOB,)) as pool:
+            futures = [pool.submit(fit_and_score_window, X_train, y_train, X_score, params) for _, X_train, y_train, X_score in tasks]
+            probabilities = [future.result() for future in futures]
+    scores = pd.concat([pd.DataFrame({'window_end': end, 'risk_probability': probability}, index=X_score.index) for (end, _, _, X_score), probability in zip(tasks, probabilities)]).sort_index()
+    tickers = scores.index.get_level_values('ticker')
+    fundamental = pd.Series({ticker: get_fundamental_score({'info': info_by_ticker.get(ticker) or {}})[0] for ticker in tickers.unique()})
+    penalty = (scores['risk_probability'] * 50).astype(int)
+    scores['technical_score'] = ((1 - scores['risk_probability']) * 100).astype(int)
+    scores['stability_score'] = np.maximum(0, fundamental.reindex(tickers).to_numpy() - penalty.to_numpy())
+    scores['realized_target'] = realized_targets(panel).reindex(scores.index)
+    return scores
+
+def _auc(y_true: pd.Series, y_score: pd.Series):
+    from sklearn.metrics import roc_auc_score
+    return float(roc_auc_score(y_true, y_score)) if y_true.nunique() > 1 else None
+
+def backtest_metrics(scores: pd.DataFrame) -> dict:
+    """Out-of-sample AUC and Brier score overall, per ticker and per calendar year, over rows whose outcome is known."""
+    evaluated = scores.dropna(subset=['realized_target'])
+    y, p = evaluated['realized_target'].astype(int), evaluated['risk_probability']
+    dates = evaluated.index.get_level_values('date')
+    return {
+        "rows_scored": int(len(scores)), "rows_evaluated": int(len(evaluated)), "windows": int(scores['window_end'].nunique()),
+        "date_range": {"start": str(dates.min().date()), "end": str(dates.max().date())} if len(evaluated) else None,
+        "positive_rate": float(y.mean()) if len(y) else None, "roc_auc": _auc(y, p), "brier_score": float(((p - y) ** 2).mean()) if len(y) else None,
+        "by_ticker": {ticker: {"rows": int(len(group)), "roc_auc": _auc(group['realized_target'].astype(int), group['risk_probability'])} for ticker, group in evaluated.groupby(level='ticker')},
+        "by_year": {str(year): {"rows": int(len(group)), "roc_auc": _auc(group['realized_target'].astype(int), group['risk_probability'])} for year, group in evaluated.groupby(dates.year)},
+    }
+
+def write_backtest_results(scores: pd.DataFrame, metrics: dict, output_dir: str = "results/backtest"):
+    """Writes per-date scores (Parquet) and metrics (JSON) to `output_dir`; returns their paths."""
+    os.makedirs(output_dir, exist_ok=True)
+    scores_path, metrics_path = os.path.join(output_dir, "scores.parquet"), os.path.join(output_dir, "metrics.json")
+    scores.to_parquet(scores_path, engine="pyarrow")
+    with open(metrics_path, "w") as f: json.dump(metrics, f, indent=2, default=str)
+    return scores_path, metrics_path
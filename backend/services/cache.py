@@ -0,0 +1,116 @@
+# backend/services/cache.py
+
+import asyncio
+import threading
+import time
+import logging
+from collections import OrderedDict
+from concurrent.futures import Future
+from .metrics import cache_requests
+
+_MISSING = object()
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry TTLs, single-flight loading and stale-while-revalidate.
+
+    An entry is fresh for `ttl` seconds and may then be served stale for another `stale_ttl`
+    seconds while one background thread refreshes it. Concurrent misses on the same key share
+    a single loader call. Loader exceptions are never cached.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 3600, stale_ttl: float = 0, name: str = "cache"):
+        self.maxsize, self.ttl, self.stale_ttl, self.name = maxsize, ttl, stale_ttl, name
+        self._entries = OrderedDict()  # key -> (value, expires_at, stale_until)
+        self._inflight = {}  # key -> Future shared by every caller waiting on the same load
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Returns a fresh cached value without loading, or `default`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() >= entry[1]:
+                cache_requests.inc(cache=self.name, result="miss"); return default
+            self._entries.move_to_end(key)
+        cache_requests.inc(cache=self.name, result="hit"); return entry[0]
+
+    def set(self, key, value, ttl: float = None, stale_ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        stale_ttl = self.stale_ttl if stale_ttl is None else stale_ttl
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at, expires_at + stale_ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize: self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock: self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock: self._entries.clear()
+
+    def get_or_load(self, key, loader, ttl: float = None, stale_ttl: float = None):
+        """Returns the cached value for `key`, calling `loader()` at most once per refresh."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, stale_until = entry
+                if now < expires_at:
+                    self._entries.move_to_end(key); cache_requests.inc(cache=self.name, result="hit"); return value
+                if now < stale_until:
+                    self._entries.move_to_end(key)
+                    if key not in self._inflight:
+                        future = self._inflight[key] = Future()
+                        threading.Thread(target=self._load, args=(key, loader, ttl, stale_ttl, future), daemon=True, name=f"{self.name}-refresh").start()
+                    cache_requests.inc(cache=self.name, result="stale"); return value
+                del self._entries[key]
+            cache_requests.inc(cache=self.name, result="miss")
+            future = self._inflight.get(key)
+            is_owner = future is None
+            if is_owner: future = self._inflight[key] = Future()
+        if is_owner: self._load(key, loader, ttl, stale_ttl, future)
+        return future.result()
+
+    def _load(self, key, loader, ttl, stale_ttl, future: Future):
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock: self._inflight.pop(key, None)
+            logging.warning(f"[{self.name}] Load failed for {key!r}: {e}")
+            future.set_exception(e); return
+        self.set(key, value, ttl=ttl, stale_ttl=stale_ttl)
+        with self._lock: self._inflight.pop(key, None)
+        future.set_result(value)
+
+class AsyncSingleFlight:
+    """Coalesces concurrent coroutine calls by key and keeps each result for `ttl` seconds.
+
+    The first caller for a key runs `factory()` as a task; callers arriving while it runs await
+    the same task, shielded so one client disconnecting cannot cancel it for the others.
+    Exceptions reach every waiter but are never cached, and neither are results `cache_if`
+    rejects. Tasks belong to the running event loop.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 10, name: str = "singleflight", cache_if=None):
+        self.results = TTLCache(maxsize=maxsize, ttl=ttl, name=name)
+        self.cache_if = cache_if
+        self._inflight = {}  # key -> asyncio.Task computing it
+
+    async def run(self, key, factory):
+        value = self.results.get(key, _MISSING)
+        if value is not _MISSING: return value
+        task = self._inflight.get(key)
+        if task is None: task = self._inflight[key] = asyncio.ensure_future(self._load(key, factory))
+        else: cache_requests.inc(cache=self.results.name, result="coalesced")
+        return await asyncio.shield(task)
+
+    async def _load(self, key, factory):
+        try:
+            value = await factory()
+            if self.cache_if is None or self.cache_if(value): self.results.set(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
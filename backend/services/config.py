@@ -2,3 +2,111 @@ import os
 
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
 FRED_API_KEY = os.getenv("FRED_API_KEY")
+
+# Where upstream data comes from: "live" (yfinance, FRED, NewsAPI), "record" (live, saving every response
+# under DATA_FIXTURES_DIR) or "replay" (those fixtures only, no network or API keys). REPLAY_LATENCY_SECONDS
+# injects a delay per replayed call: "0.05" for every source or e.g. "news=0.8,fred_series=0.3,*=0.05".
+DATA_PROVIDER = os.getenv("DATA_PROVIDER", "live")
+DATA_FIXTURES_DIR = os.getenv("DATA_FIXTURES_DIR", "data/fixtures")
+REPLAY_LATENCY_SECONDS = os.getenv("REPLAY_LATENCY_SECONDS", "0")
+
+# Upper bound on blocking calls in flight at once per worker, for each upstream source (yfinance, NewsAPI,
+# FRED, S&P 500 momentum) separately, so calls hung on one source never starve the others.
+FETCH_MAX_WORKERS = int(os.getenv("FETCH_MAX_WORKERS", "16"))
+# POST /api/v1/score/batch fetches on separate pools of this size per source, never more tickers at
+# once than they have threads, so a large batch neither queues past its own deadlines nor starves /api/v1/score.
+BATCH_FETCH_MAX_WORKERS = int(os.getenv("BATCH_FETCH_MAX_WORKERS", "8"))
+
+# Fetch deadlines. Each source gets its own budget and a score request's fetches as a whole get
+# FETCH_DEADLINE_SECONDS; news, FRED or market data that miss it fall back to their neutral defaults
+# and are reported as degraded. NEWS_HEDGE_AFTER_SECONDS starts a second NewsAPI call when the first
+# has not answered by then. 0 disables any of these.
+FETCH_DEADLINE_SECONDS = float(os.getenv("FETCH_DEADLINE_SECONDS", "8"))
+YFINANCE_TIMEOUT_SECONDS = float(os.getenv("YFINANCE_TIMEOUT_SECONDS", "6"))
+NEWS_TIMEOUT_SECONDS = float(os.getenv("NEWS_TIMEOUT_SECONDS", "2.5"))
+FRED_TIMEOUT_SECONDS = float(os.getenv("FRED_TIMEOUT_SECONDS", "2.5"))
+MARKET_SENTIMENT_TIMEOUT_SECONDS = float(os.getenv("MARKET_SENTIMENT_TIMEOUT_SECONDS", "2.5"))
+NEWS_HEDGE_AFTER_SECONDS = float(os.getenv("NEWS_HEDGE_AFTER_SECONDS", "0"))
+
+# Concurrent /api/v1/score requests for the same ticker share one fetch-and-score run, whose payload
+# is then reused for SCORE_RESULT_TTL_SECONDS (keep this well below PRICE_STORE_REFRESH_SECONDS).
+SCORE_RESULT_TTL_SECONDS = float(os.getenv("SCORE_RESULT_TTL_SECONDS", "10"))
+SCORE_RESULT_CACHE_SIZE = int(os.getenv("SCORE_RESULT_CACHE_SIZE", "1024"))
+
+# Nightly score snapshots (src/snapshot_scores.py) for SNAPSHOT_TICKERS, kept in SQLite. /api/v1/score serves a
+# ticker's snapshot while it is younger than SNAPSHOT_MAX_AGE_SECONDS and scores live otherwise. "" disables the store.
+SNAPSHOT_DB_PATH = os.getenv("SNAPSHOT_DB_PATH", "data/snapshots.db")
+SNAPSHOT_MAX_AGE_SECONDS = float(os.getenv("SNAPSHOT_MAX_AGE_SECONDS", str(36 * 3600)))
+SNAPSHOT_TICKERS = [ticker.strip().upper() for ticker in os.getenv("SNAPSHOT_TICKERS", "").split(",") if ticker.strip()]
+
+# Largest page GET /api/v1/screen returns.
+SCREEN_MAX_LIMIT = int(os.getenv("SCREEN_MAX_LIMIT", "500"))
+
+# Ticker-independent market inputs are cached per process. After the TTL they are served stale
+# for up to MARKET_DATA_STALE_SECONDS while a single background refresh runs.
+MARKET_SENTIMENT_TTL_SECONDS = float(os.getenv("MARKET_SENTIMENT_TTL_SECONDS", "3600"))
+FRED_TTL_SECONDS = float(os.getenv("FRED_TTL_SECONDS", "21600"))
+MARKET_DATA_STALE_SECONDS = float(os.getenv("MARKET_DATA_STALE_SECONDS", "86400"))
+MARKET_DATA_CACHE_SIZE = int(os.getenv("MARKET_DATA_CACHE_SIZE", "32"))
+
+# In-process model registry bounds (count and total serialized size of cached models).
+MODEL_CACHE_MAX_MODELS = int(os.getenv("MODEL_CACHE_MAX_MODELS", "64"))
+MODEL_CACHE_MAX_BYTES = int(os.getenv("MODEL_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Background training: worker threads draining the job queue, and finished jobs kept for status polling.
+TRAINING_WORKERS = int(os.getenv("TRAINING_WORKERS", "2"))
+TRAINING_JOB_HISTORY = int(os.getenv("TRAINING_JOB_HISTORY", "1000"))
+
+# Retraining policy: a ticker is retrained at most once per RETRAIN_MIN_INTERVAL_SECONDS, and only
+# when new price data has arrived or its model is older than RETRAIN_MAX_MODEL_AGE_SECONDS.
+RETRAIN_MIN_INTERVAL_SECONDS = float(os.getenv("RETRAIN_MIN_INTERVAL_SECONDS", "21600"))
+RETRAIN_MAX_MODEL_AGE_SECONDS = float(os.getenv("RETRAIN_MAX_MODEL_AGE_SECONDS", str(7 * 86400)))
+RETRAIN_MAX_PENDING = int(os.getenv("RETRAIN_MAX_PENDING", "100"))
+
+# Model fits run in a separate process pool so they never compete with request handling for the GIL.
+# TRAINING_THREADS_PER_JOB is XGBoost's n_jobs inside each training process.
+TRAINING_PROCESSES = int(os.getenv("TRAINING_PROCESSES", "2"))
+TRAINING_THREADS_PER_JOB = int(os.getenv("TRAINING_THREADS_PER_JOB", "1"))
+
+# Hyperparameter search. Studies persist per ticker so a retrain warm-starts from the previous best
+# parameters and runs OPTUNA_WARM_START_TRIALS instead of OPTUNA_TRIALS. OPTUNA_STORAGE_URL is either
+# "journal:<path>" (an append-only file that is safe to share between training processes), an RDB URL,
+# or "" for in-memory studies. Each run searches in memory, OPTUNA_N_JOBS trials at a time, and then
+# appends its trials to the persistent study.
+OPTUNA_STORAGE_URL = os.getenv("OPTUNA_STORAGE_URL", "journal:backend/ml_models/optuna_studies.journal")
+OPTUNA_TRIALS = int(os.getenv("OPTUNA_TRIALS", "25"))
+OPTUNA_WARM_START_TRIALS = int(os.getenv("OPTUNA_WARM_START_TRIALS", "6"))
+OPTUNA_N_JOBS = int(os.getenv("OPTUNA_N_JOBS", "2"))
+OPTUNA_EARLY_STOPPING_ROUNDS = int(os.getenv("OPTUNA_EARLY_STOPPING_ROUNDS", "20"))
+
+# Number of tickers whose incremental rolling-feature state is kept in memory.
+FEATURE_STATE_CACHE_SIZE = int(os.getenv("FEATURE_STATE_CACHE_SIZE", "5000"))
+
+# Local OHLCV store (one Parquet file per ticker). A ticker's first fetch downloads
+# PRICE_STORE_BOOTSTRAP_PERIOD of history; later fetches only request bars since the last stored
+# date, and none at all while the file is younger than PRICE_STORE_REFRESH_SECONDS. Set PRICE_STORE_DIR to "" to disable.
+PRICE_STORE_DIR = os.getenv("PRICE_STORE_DIR", "data/prices")
+PRICE_STORE_BOOTSTRAP_PERIOD = os.getenv("PRICE_STORE_BOOTSTRAP_PERIOD", "5y")
+PRICE_STORE_REFRESH_SECONDS = float(os.getenv("PRICE_STORE_REFRESH_SECONDS", "900"))
+
+# Score responses smaller than this are sent uncompressed even when the client accepts gzip/zstd.
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+
+# Maximum number of tickers accepted by one POST /api/v1/score/batch request.
+BATCH_MAX_TICKERS = int(os.getenv("BATCH_MAX_TICKERS", "500"))
+
+# Explanation backend: "native" (XGBoost pred_contribs, fast) or "shap" (shap.TreeExplainer).
+EXPLAIN_BACKEND = os.getenv("EXPLAIN_BACKEND", "native")
+
+# Which models score a ticker: "per_ticker" (train one per ticker on first sight), "global" (the pooled
+# cross-sectional model; per-ticker files, where present, act as fine-tunes) or "auto" (global once trained).
+MODEL_MODE = os.getenv("MODEL_MODE", "auto")
+
+# Bundled NLTK data (the VADER lexicon), e.g. from `python -m nltk.downloader -d backend/nltk_data vader_lexicon`.
+NLTK_DATA_DIR = os.getenv("NLTK_DATA_DIR", "backend/nltk_data")
+
+# Comma-separated tickers whose models are preloaded at API startup.
+WARMUP_TICKERS = [ticker.strip().upper() for ticker in os.getenv("WARMUP_TICKERS", "").split(",") if ticker.strip()]
+
+# Headline sentiment cache: compound scores kept per distinct headline (LRU-evicted).
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "50000"))
@@ -1,57 +1,253 @@
 # backend/services/data_fetcher.py
 
-import yfinance as yf
-from newsapi import NewsApiClient
-from fredapi import Fred
 import pandas as pd
 from datetime import datetime
 import logging
-from .config import NEWS_API_KEY, FRED_API_KEY
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from .config import FETCH_MAX_WORKERS, BATCH_FETCH_MAX_WORKERS, FETCH_DEADLINE_SECONDS, YFINANCE_TIMEOUT_SECONDS, NEWS_TIMEOUT_SECONDS, FRED_TIMEOUT_SECONDS, MARKET_SENTIMENT_TIMEOUT_SECONDS, NEWS_HEDGE_AFTER_SECONDS, MARKET_SENTIMENT_TTL_SECONDS, FRED_TTL_SECONDS, MARKET_DATA_STALE_SECONDS, MARKET_DATA_CACHE_SIZE, PRICE_STORE_DIR, PRICE_STORE_BOOTSTRAP_PERIOD, PRICE_STORE_REFRESH_SECONDS
+from .cache import TTLCache
+from .price_store import PriceStore
+from .data_providers import get_data_provider
+from .metrics import time_source, source_errors, source_deadline_misses, source_hedges
 
-newsapi = NewsApiClient(api_key=NEWS_API_KEY)
-fred = Fred(api_key=FRED_API_KEY)
+# The upstream clients are blocking, so they run on bounded pools shared by every in-flight request:
+# one per source, so a source whose calls hang can only tie up its own threads, and a separate set
+# for batch scoring, so a large batch cannot starve interactive requests.
+FETCH_SOURCES = ("yfinance", "newsapi", "fred", "sp500")
+FETCH_POOL_SIZES = {"interactive": FETCH_MAX_WORKERS, "batch": BATCH_FETCH_MAX_WORKERS}
+fetch_executors = {(pool, source): ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"fetch-{pool}-{source}") for pool, size in FETCH_POOL_SIZES.items() for source in FETCH_SOURCES}
+# S&P 500 momentum and FRED series are identical for every ticker, so one copy is shared per process.
+market_data_cache = TTLCache(maxsize=MARKET_DATA_CACHE_SIZE, stale_ttl=MARKET_DATA_STALE_SECONDS, name="market_data")
+price_store = PriceStore(PRICE_STORE_DIR) if PRICE_STORE_DIR else None
 
-def get_yahoo_finance_data(ticker_symbol: str):
+def _normalize_history(hist: pd.DataFrame) -> pd.DataFrame:
+    # yfinance stamps bars at midnight exchange time; keep the wall-clock date and drop the zone.
+    hist = hist.copy(); hist.index = pd.DatetimeIndex(hist.index).tz_localize(None).normalize(); hist.index.name = "Date"
+    return hist
+
+def _delta_start(stored: pd.DataFrame) -> pd.Timestamp:
+    """Where a delta fetch starts: the last complete stored bar, since the very last one may have been saved mid-session."""
+    return stored.index[-2] if len(stored) > 1 else stored.index[-1]
+
+def _adjustment_changed(stored: pd.DataFrame, delta: pd.DataFrame) -> bool:
+    """True if a split or dividend since the stored history re-adjusted yfinance's prices.
+
+    yfinance returns split- and dividend-adjusted bars, so appending a delta fetched after such
+    an action onto bars adjusted before it would leave a fake jump at the seam. The delta's first
+    bar is one the store already holds as complete; if its close has moved, or a new bar carries
+    an action, every stored price is stale.
+    """
+    if delta.empty: return False
+    reference = _delta_start(stored)
+    new_bars = delta[delta.index > stored.index[-1]]
+    if any((new_bars[column].fillna(0) != 0).any() for column in ("Dividends", "Stock Splits") if column in new_bars.columns): return True
+    if reference not in delta.index or pd.isna(delta.at[reference, 'Close']) or pd.isna(stored.at[reference, 'Close']): return False
+    return abs(float(delta.at[reference, 'Close']) / float(stored.at[reference, 'Close']) - 1) > 1e-4
+
+def _bootstrap_history(ticker_symbol: str, rebuild: bool = False) -> pd.DataFrame:
+    """Downloads PRICE_STORE_BOOTSTRAP_PERIOD of history into the store; `rebuild` replaces whatever is stored."""
+    hist = get_data_provider().history(ticker_symbol, period=PRICE_STORE_BOOTSTRAP_PERIOD)
+    if hist.empty: return hist
+    return (price_store.replace if rebuild else price_store.merge)(ticker_symbol, _normalize_history(hist))
+
+def _get_stored_history(ticker_symbol: str, history_years: int) -> pd.DataFrame:
+    """Brings the local store up to date with only the missing bars and returns the requested window."""
+    stored = price_store.read(ticker_symbol)
+    if stored is None or stored.empty:
+        bars = _bootstrap_history(ticker_symbol)
+        if bars.empty: return bars
+    elif price_store.age_seconds(ticker_symbol) < PRICE_STORE_REFRESH_SECONDS:
+        bars = stored
+    else:
+        try:
+            hist = _normalize_history(get_data_provider().history(ticker_symbol, start=_delta_start(stored).strftime('%Y-%m-%d')))
+            if _adjustment_changed(stored, hist):
+                logging.info(f"Prices for {ticker_symbol} were re-adjusted upstream (split or dividend); rebuilding its stored history.")
+                bars = _bootstrap_history(ticker_symbol, rebuild=True)
+                if bars.empty: bars = stored
+            else:
+                bars = price_store.merge(ticker_symbol, hist) if not hist.empty else stored
+        except Exception as e:
+            logging.warning(f"Delta price fetch failed for {ticker_symbol}, serving stored bars: {e}"); bars = stored
+    return bars[bars.index >= pd.Timestamp.now().normalize() - pd.DateOffset(years=history_years)]
+
+def get_yahoo_finance_data(ticker_symbol: str, history_years: int = 1):
     logging.info(f"Fetching yfinance data for ticker: {ticker_symbol}")
     try:
-        ticker = yf.Ticker(ticker_symbol)
-        hist_data = ticker.history(period="1y")
-        if hist_data.empty: return None
+        provider = get_data_provider()
+        with time_source("yfinance_history"):
+            hist_data = _get_stored_history(ticker_symbol, history_years) if price_store is not None else provider.history(ticker_symbol, period=f"{history_years}y")
+        if hist_data.empty:
+            source_errors.inc(source="yfinance_history"); return None
         hist_data.index = hist_data.index.map(lambda x: x.strftime('%Y-%m-%d'))
-        info = ticker.info
+        with time_source("yfinance_info"): info = provider.info(ticker_symbol)
         return {"historical_data": hist_data.to_dict(orient="index"), "info": {"longName": info.get("longName"), "sector": info.get("sector"), "marketCap": info.get("marketCap"), "trailingPE": info.get("trailingPE"), "dividendYield": info.get("dividendYield"), "debtToEquity": info.get("debtToEquity"), "totalCashPerShare": info.get("totalCashPerShare")}}
     except Exception as e:
-        logging.error(f"yfinance error for {ticker_symbol}: {e}"); return None
+        source_errors.inc(source="yfinance"); logging.error(f"yfinance error for {ticker_symbol}: {e}"); return None
+
+def _fetch_fred_series(series_id: str, years: int = 1):
+    logging.info(f"Fetching {years}y of FRED data for series: {series_id}")
+    end_date = datetime.now()
+    # Two extra months, so the 30-row treasury change is defined from the first price bar on.
+    start_date = end_date - pd.DateOffset(years=years, months=2)
+    with time_source("fred"): return get_data_provider().fred_series(series_id, start_date=start_date, end_date=end_date)
 
-def get_fred_data(series_id='DGS10'):
+def get_fred_data(series_id='DGS10', years: int = 1):
+    """The FRED series over the last `years` years (cached per series and window); None if FRED is unavailable.
+
+    Callers engineering features over longer price histories must pass a matching `years`, or the
+    treasury feature is zero wherever the series does not reach.
+    """
     try:
-        logging.info(f"Fetching FRED data for series: {series_id}")
-        end_date = datetime.now()
-        start_date = end_date - pd.DateOffset(years=1)
-        series_data = fred.get_series(series_id, start_date=start_date, end_date=end_date)
-        return series_data
+        return market_data_cache.get_or_load(("fred", series_id, years), partial(_fetch_fred_series, series_id, years), ttl=FRED_TTL_SECONDS)
     except Exception as e:
-        logging.error(f"Could not fetch FRED data for {series_id}: {e}"); return None
+        source_errors.inc(source="fred"); logging.error(f"Could not fetch FRED data for {series_id}: {e}"); return None
+
+def _fetch_market_sentiment():
+    logging.info("Fetching S&P 500 data for market sentiment.")
+    with time_source("sp500"): hist = get_data_provider().history("^GSPC", period="4mo")
+    if hist.empty or len(hist) < 2: raise ValueError("Not enough S&P 500 data.")
+    price_now = hist['Close'].iloc[-1]; price_ago = hist['Close'].iloc[0]
+    return ((price_now - price_ago) / price_ago) * 100
 
 def get_market_sentiment_data():
     try:
-        logging.info("Fetching S&P 500 data for market sentiment.")
-        sp500 = yf.Ticker("^GSPC"); hist = sp500.history(period="4mo")
-        if hist.empty or len(hist) < 2:
-            logging.warning("Not enough S&P 500 data."); return 0.0
-        price_now = hist['Close'].iloc[-1]; price_ago = hist['Close'].iloc[0]
-        return ((price_now - price_ago) / price_ago) * 100
+        return market_data_cache.get_or_load("market_sentiment", _fetch_market_sentiment, ttl=MARKET_SENTIMENT_TTL_SECONDS)
     except Exception as e:
-        logging.error(f"Could not fetch market sentiment data: {e}"); return 0.0
+        source_errors.inc(source="sp500"); logging.error(f"Could not fetch market sentiment data: {e}"); return 0.0
 
 def get_news_data(query: str):
-    if not NEWS_API_KEY or NEWS_API_KEY == "YOUR_API_KEY":
+    if not get_data_provider().news_enabled:
         logging.warning("NewsAPI key not configured."); return None
     from datetime import timedelta
     logging.info(f"Fetching news from NewsAPI for query: '{query}'")
     try:
         from_date = (datetime.now() - timedelta(days=29)).strftime('%Y-%m-%d')
-        all_articles = newsapi.get_everything(q=query, language='en', sort_by='relevancy', from_param=from_date, page_size=20)
+        with time_source("newsapi"): all_articles = get_data_provider().news(query, from_date=from_date, page_size=20)
         return [{"source": article["source"]["name"], "title": article["title"], "url": article["url"], "publishedAt": article["publishedAt"], "content": article.get("content", "")} for article in all_articles["articles"]]
     except Exception as e:
-        logging.error(f"NewsAPI error for query '{query}': {e}"); return None
\ No newline at end of file
+        source_errors.inc(source="newsapi"); logging.error(f"NewsAPI error for query '{query}': {e}"); return None
+
+async def run_blocking(func, *args, source: str = "yfinance", pool: str = "interactive", **kwargs):
+    """Runs a blocking fetcher on `source`'s fetch pool without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(fetch_executors[(pool, source)], partial(func, *args, **kwargs))
+
+def _budget(timeout: float, deadline_at: float = None):
+    """Seconds left for one source: its own timeout capped by the request deadline, or None if neither applies."""
+    budgets = [timeout] if timeout > 0 else []
+    if deadline_at is not None: budgets.append(max(0.0, deadline_at - asyncio.get_running_loop().time()))
+    return min(budgets) if budgets else None
+
+async def fetch_with_deadline(source: str, timeout: float, default, func, *args, hedge_after: float = 0, pool: str = "interactive", **kwargs):
+    """Runs a blocking fetcher within `timeout` seconds and returns (value, missed_deadline).
+
+    A call that misses the deadline is abandoned, not interrupted: its thread finishes in the
+    background (so a cache fill still lands for the next request), bounded by the client's own
+    socket timeout, and `default` is returned. `source` and `pool` pick the executor the call runs
+    on; the clock starts at submission, so callers must not queue more calls than it has threads.
+    With `hedge_after`, a second identical call starts if the first has not answered by then
+    and whichever finishes first wins; only use it for side-effect-free fetchers.
+    """
+    if timeout is None: return await run_blocking(func, *args, source=source, pool=pool, **kwargs), False
+    loop = asyncio.get_running_loop(); deadline_at = loop.time() + timeout
+    attempts = [asyncio.ensure_future(run_blocking(func, *args, source=source, pool=pool, **kwargs))]
+    if 0 < hedge_after < timeout:
+        done, _ = await asyncio.wait(attempts, timeout=hedge_after)
+        if not done:
+            source_hedges.inc(source=source); attempts.append(asyncio.ensure_future(run_blocking(func, *args, source=source, pool=pool, **kwargs)))
+    done, _ = await asyncio.wait(attempts, timeout=max(0.0, deadline_at - loop.time()), return_when=asyncio.FIRST_COMPLETED)
+    if not done:
+        source_deadline_misses.inc(source=source)
+        logging.warning(f"{source} did not answer within {timeout:.2f}s; continuing without it."); return default, True
+    return done.pop().result(), False
+
+async def fetch_ticker_inputs(ticker_symbol: str, deadline_at: float = None, pool: str = "interactive"):
+    """Fetches the ticker-specific inputs: yfinance data, then news for the company name it returns.
+
+    Returns (yf_data, news_data, degraded), where `degraded` lists the inputs that missed their deadline.
+    """
+    yf_data, yf_missed = await fetch_with_deadline("yfinance", _budget(YFINANCE_TIMEOUT_SECONDS, deadline_at), None, get_yahoo_finance_data, ticker_symbol, pool=pool)
+    if yf_missed: return None, None, ["yf_data"]
+    if not yf_data or not yf_data.get("info"): return yf_data, None, []
+    company_name = yf_data["info"].get("longName") or ticker_symbol
+    news_data, news_missed = await fetch_with_deadline("newsapi", _budget(NEWS_TIMEOUT_SECONDS, deadline_at), None, get_news_data, query=company_name, hedge_after=NEWS_HEDGE_AFTER_SECONDS, pool=pool)
+    return yf_data, news_data, ["news_data"] if news_missed else []
+
+async def fetch_market_inputs(deadline_at: float = None):
+    """Fetches the ticker-independent inputs; returns (market_sentiment, fred_data, degraded)."""
+    (market_sentiment, market_missed), (fred_data, fred_missed) = await asyncio.gather(
+        fetch_with_deadline("sp500", _budget(MARKET_SENTIMENT_TIMEOUT_SECONDS, deadline_at), 0.0, get_market_sentiment_data),
+        fetch_with_deadline("fred", _budget(FRED_TIMEOUT_SECONDS, deadline_at), None, get_fred_data))
+    return market_sentiment, fred_data, ["market_sentiment"] * market_missed + ["fred_data"] * fred_missed
+
+async def fetch_score_inputs(ticker_symbol: str, deadline: float = FETCH_DEADLINE_SECONDS):
+    """Fetches all upstream inputs for a ticker concurrently, all within `deadline` seconds.
+
+    Market sentiment and FRED do not depend on the ticker and start immediately. The news
+    query needs the company name, so it is chained right behind the yfinance call while the
+    other two sources are still in flight. Inputs that miss their deadline keep the neutral
+    defaults the fetchers fall back to on errors and are named in "degraded".
+    """
+    deadline_at = asyncio.get_running_loop().time() + deadline if deadline > 0 else None
+    (yf_data, news_data, ticker_degraded), (market_sentiment, fred_data, market_degraded) = await asyncio.gather(
+        fetch_ticker_inputs(ticker_symbol, deadline_at), fetch_market_inputs(deadline_at))
+    return {"yf_data": yf_data, "market_sentiment": market_sentiment, "fred_data": fred_data, "news_data": news_data, "degraded": ticker_degraded + market_degraded}
+
+def fetch_ticker_inputs_batch(ticker_symbols: list) -> dict:
+    """Starts fetching every ticker's inputs on the batch pools; returns {task: ticker} for asyncio.wait.
+
+    At most BATCH_FETCH_MAX_WORKERS tickers fetch at once, and a ticker's deadlines only start once
+    it holds a slot, so no call times out while queued behind the rest of the batch.
+    """
+    slots = asyncio.Semaphore(BATCH_FETCH_MAX_WORKERS)
+    async def fetch(ticker_symbol: str):
+        async with slots: return await fetch_ticker_inputs(ticker_symbol, pool="batch")
+    return {asyncio.ensure_future(fetch(ticker_symbol)): ticker_symbol for ticker_symbol in ticker_symbols}
+
+def prefetch_price_histories(ticker_symbols: list):
+    """Brings many tickers' stored price histories up to date with at most two bulk yf.download calls.
+
+    Tickers never stored are bootstrapped together and stale ones are refreshed together from the
+    oldest delta start, so the per-ticker get_yahoo_finance_data calls that follow read fresh files
+    without another history request. Stale tickers whose prices were re-adjusted upstream are
+    re-bootstrapped in a third download. Failures just leave those fetches to run as usual.
+    """
+    if price_store is None or not ticker_symbols: return
+    new_symbols, stale = [], {}
+    for symbol in ticker_symbols:
+        age = price_store.age_seconds(symbol)
+        if age is None: new_symbols.append(symbol)
+        elif age >= PRICE_STORE_REFRESH_SECONDS:
+            stored = price_store.read(symbol)
+            if stored is None or stored.empty: new_symbols.append(symbol)
+            else: stale[symbol] = stored
+    if stale:
+        readjusted = _bulk_download(list(stale), {"start": min(_delta_start(stored) for stored in stale.values()).strftime('%Y-%m-%d')}, stale)
+        if readjusted: logging.info(f"Prices for {len(readjusted)} tickers were re-adjusted upstream (split or dividend); rebuilding their stored histories.")
+        new_symbols += readjusted
+    if new_symbols: _bulk_download(new_symbols, {"period": PRICE_STORE_BOOTSTRAP_PERIOD}, {symbol: None for symbol in new_symbols}, rebuild=True)
+
+def _bulk_download(symbols: list, period_kwargs: dict, stored_by_symbol: dict, rebuild: bool = False) -> list:
+    """Downloads `symbols` in one yf.download call into the store; returns those whose stored prices need a rebuild."""
+    logging.info(f"Bulk-downloading price history for {len(symbols)} tickers.")
+    try:
+        with time_source("yfinance_download"): data = get_data_provider().download(symbols, **period_kwargs)
+    except Exception as e:
+        source_errors.inc(source="yfinance_download"); logging.warning(f"Bulk price download failed, falling back to per-ticker fetches: {e}"); return []
+    readjusted = []
+    for symbol in symbols:
+        if isinstance(data.columns, pd.MultiIndex):
+            if symbol not in data.columns.get_level_values(0): continue
+            bars = data[symbol]
+        else:
+            bars = data
+        bars = bars.dropna(how="all")
+        if bars.empty: continue
+        bars = _normalize_history(bars); stored = stored_by_symbol.get(symbol)
+        if stored is not None and _adjustment_changed(stored, bars): readjusted.append(symbol)
+        elif rebuild: price_store.replace(symbol, bars)
+        else: price_store.merge(symbol, bars)
+    return readjusted
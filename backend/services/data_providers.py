@@ -0,0 +1,199 @@
+# backend/services/data_providers.py
+
+import os
+import time
+import gzip
+import json
+import inspect
+import hashlib
+import logging
+from functools import lru_cache, partial
+from .config import NEWS_API_KEY, FRED_API_KEY, DATA_PROVIDER, DATA_FIXTURES_DIR, REPLAY_LATENCY_SECONDS, YFINANCE_TIMEOUT_SECONDS, NEWS_TIMEOUT_SECONDS, FRED_TIMEOUT_SECONDS
+
+DATA_PROVIDERS = ("live", "record", "replay")
+PROVIDER_METHODS = ("history", "info", "download", "fred_series", "news")
+# Arguments that only slide a date window forward are left out of fixture keys, so a recording keeps replaying on later days.
+WINDOW_ARGS = {"start", "start_date", "end_date", "from_date"}
+
+class FixtureNotFoundError(LookupError):
+    """Replay was asked for a call that was never recorded."""
+
+class ReplayedUpstreamError(RuntimeError):
+    """An upstream error captured while recording, raised again on replay."""
+
+def client_timeout(seconds: float) -> float:
+    """Socket timeout for an upstream client: the source's fetch timeout, or 30s where that is disabled.
+
+    Deadlines only abandon a late call; this is what makes its thread give up and return to the pool.
+    """
+    return seconds if seconds > 0 else 30.0
+
+def timeout_session(timeout: float):
+    """A requests session that applies `timeout` to every request, overriding whatever the client library passes."""
+    import requests
+    class TimeoutSession(requests.Session):
+        def request(self, *args, **kwargs):
+            kwargs["timeout"] = timeout; return super().request(*args, **kwargs)
+    return TimeoutSession()
+
+@lru_cache(maxsize=None)
+def get_newsapi_client():
+    """Builds the NewsAPI client on first use rather than at import."""
+    from newsapi import NewsApiClient
+    return NewsApiClient(api_key=NEWS_API_KEY, session=timeout_session(client_timeout(NEWS_TIMEOUT_SECONDS)))
+
+@lru_cache(maxsize=None)
+def get_fred_client():
+    """Builds the FRED client on first use; it raises without FRED_API_KEY, which fetchers log like any other failure."""
+    from fredapi import Fred
+    class TimeoutFred(Fred):
+        # fredapi calls urlopen without a timeout; this is its private fetch helper with one added.
+        def _Fred__fetch_data(self, url):
+            import xml.etree.ElementTree as ET
+            from urllib.error import HTTPError
+            from urllib.request import urlopen
+            try:
+                return ET.fromstring(urlopen(url + '&api_key=' + self.api_key, timeout=client_timeout(FRED_TIMEOUT_SECONDS)).read())
+            except HTTPError as exc:
+                raise ValueError(ET.fromstring(exc.read()).get('message'))
+    return TimeoutFred(api_key=FRED_API_KEY)
+
+class LiveProvider:
+    """The upstream sources themselves: yfinance, FRED and NewsAPI."""
+
+    name = "live"
+
+    @property
+    def news_enabled(self) -> bool:
+        return bool(NEWS_API_KEY) and NEWS_API_KEY != "YOUR_API_KEY"
+
+    def history(self, symbol: str, period: str = None, start: str = None):
+        import yfinance as yf
+        return yf.Ticker(symbol).history(timeout=client_timeout(YFINANCE_TIMEOUT_SECONDS), **({"period": period} if start is None else {"start": start}))
+
+    def info(self, symbol: str) -> dict:
+        import yfinance as yf
+        return yf.Ticker(symbol).info  # yfinance applies its own 30s timeout to these requests
+
+    def download(self, symbols: list, period: str = None, start: str = None):
+        import yfinance as yf
+        return yf.download(symbols, group_by="ticker", auto_adjust=True, actions=True, threads=True, progress=False, timeout=client_timeout(YFINANCE_TIMEOUT_SECONDS), **({"period": period} if start is None else {"start": start}))
+
+    def fred_series(self, series_id: str, start_date=None, end_date=None):
+        return get_fred_client().get_series(series_id, start_date=start_date, end_date=end_date)
+
+    def news(self, query: str, from_date: str = None, page_size: int = 20) -> dict:
+        return get_newsapi_client().get_everything(q=query, language='en', sort_by='relevancy', from_param=from_date, page_size=page_size)
+
+FIXTURE_SUFFIX = ".json.gz"
+
+def fixture_path(root: str, method: str, *args, **kwargs) -> str:
+    """Where a call's fixture lives: keyed by method and its arguments (as LiveProvider binds them), minus WINDOW_ARGS."""
+    bound = inspect.signature(getattr(LiveProvider, method)).bind(None, *args, **kwargs); bound.apply_defaults()
+    key = {name: value for name, value in list(bound.arguments.items())[1:] if name not in WINDOW_ARGS}
+    digest = hashlib.sha256(json.dumps([method, key], sort_keys=True, default=str).encode()).hexdigest()[:32]
+    return os.path.join(root, method, f"{digest}{FIXTURE_SUFFIX}")
+
+def _parquet_path(path: str) -> str:
+    return path[:-len(FIXTURE_SUFFIX)] + ".parquet"
+
+def _atomic_write(path: str, write):
+    # Written to a temp file and renamed, so concurrent fetch threads never leave a torn fixture.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write(tmp_path); os.replace(tmp_path, path)
+
+def write_fixture(path: str, kind: str, value):
+    """Writes a fixture as plain data, never a pickle, so fixtures can be shared and replayed safely.
+
+    `kind` is "value" or "error". DataFrame and Series values go to a Parquet file next to the
+    gzipped JSON record, written first, so the JSON file's presence means the fixture is complete.
+    """
+    import pandas as pd
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    record = {"kind": kind, "value": value}
+    if isinstance(value, pd.Series):
+        record = {"kind": "series", "name": value.name}; value = value.to_frame("value")
+    elif isinstance(value, pd.DataFrame):
+        record = {"kind": "frame"}
+    if record["kind"] in ("frame", "series"):
+        _atomic_write(_parquet_path(path), lambda tmp_path: value.to_parquet(tmp_path, engine="pyarrow"))
+    def write_json(tmp_path):
+        with gzip.open(tmp_path, "wt") as f: json.dump(record, f, default=str)
+    _atomic_write(path, write_json)
+
+def read_fixture(path: str):
+    """Reads a fixture written by write_fixture; returns (kind, value), kind being "value" or "error"."""
+    with gzip.open(path, "rt") as f: record = json.load(f)
+    if record["kind"] in ("frame", "series"):
+        import pandas as pd
+        frame = pd.read_parquet(_parquet_path(path), engine="pyarrow")
+        return "value", frame if record["kind"] == "frame" else frame["value"].rename(record.get("name"))
+    return record["kind"], record.get("value")
+
+class _FixtureProvider:
+    """Exposes PROVIDER_METHODS as calls to `self.call(method, ...)`."""
+
+    def __getattr__(self, method):
+        if method not in PROVIDER_METHODS: raise AttributeError(method)
+        return partial(self.call, method)
+
+class RecordingProvider(_FixtureProvider):
+    """Passes every call through to `inner` and writes its response, or the error it raised, to a fixture (gzipped JSON, plus Parquet for tables)."""
+
+    name = "record"
+
+    def __init__(self, inner: LiveProvider, root: str):
+        self.inner, self.root = inner, root
+
+    @property
+    def news_enabled(self) -> bool:
+        return self.inner.news_enabled
+
+    def call(self, method: str, *args, **kwargs):
+        try:
+            value = getattr(self.inner, method)(*args, **kwargs)
+        except Exception as e:
+            write_fixture(fixture_path(self.root, method, *args, **kwargs), "error", f"{type(e).__name__}: {e}")
+            raise
+        write_fixture(fixture_path(self.root, method, *args, **kwargs), "value", value)
+        return value
+
+class ReplayProvider(_FixtureProvider):
+    """Serves recorded responses after an injected delay, never touching the network.
+
+    `latency` maps a method name to seconds (the "*" entry covers the rest), so upstream cost can
+    be simulated, or set to zero to time only our own compute.
+    """
+
+    name = "replay"
+    news_enabled = True
+
+    def __init__(self, root: str, latency: dict = None):
+        self.root, self.latency = root, latency or {}
+
+    def call(self, method: str, *args, **kwargs):
+        path = fixture_path(self.root, method, *args, **kwargs)
+        delay = self.latency.get(method, self.latency.get("*", 0.0))
+        if delay > 0: time.sleep(delay)
+        try:
+            kind, value = read_fixture(path)
+        except FileNotFoundError:
+            raise FixtureNotFoundError(f"No recorded {method} response for {args} {kwargs} in {self.root}.") from None
+        if kind == "error": raise ReplayedUpstreamError(value)
+        return value
+
+def parse_latency(spec: str) -> dict:
+    """Parses "0.05" (every method) or "news=0.8,fred_series=0.3,*=0.05" into {method: seconds}."""
+    if not spec or not spec.strip(): return {}
+    if "=" not in spec: return {"*": float(spec)}
+    return {name.strip(): float(value) for name, value in (item.split("=", 1) for item in spec.split(",") if item.strip())}
+
+@lru_cache(maxsize=None)
+def get_data_provider():
+    """The process-wide provider selected by DATA_PROVIDER."""
+    if DATA_PROVIDER not in DATA_PROVIDERS: raise ValueError(f"Unknown DATA_PROVIDER '{DATA_PROVIDER}'; expected one of {DATA_PROVIDERS}.")
+    if DATA_PROVIDER == "record": provider = RecordingProvider(LiveProvider(), DATA_FIXTURES_DIR)
+    elif DATA_PROVIDER == "replay": provider = ReplayProvider(DATA_FIXTURES_DIR, parse_latency(REPLAY_LATENCY_SECONDS))
+    else: provider = LiveProvider()
+    if provider.name != "live": logging.info(f"Using the {provider.name} data provider with fixtures in {DATA_FIXTURES_DIR}.")
+    return provider
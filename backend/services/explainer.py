@@ -0,0 +1,33 @@
+# backend/services/explainer.py
+
+import numpy as np
+import pandas as pd
+from xgboost import DMatrix
+from .config import EXPLAIN_BACKEND
+from .metrics import time_stage
+
+EXPLAIN_BACKENDS = ("native", "shap")
+
+def get_shap_rows(shap_values) -> np.ndarray:
+    """Normalizes TreeExplainer output to one row of per-feature contributions per input row."""
+    return np.asarray(shap_values[0] if len(np.array(shap_values).shape) == 3 else shap_values)
+
+def explain(loaded, rows: pd.DataFrame, backend: str = None) -> np.ndarray:
+    """Per-feature contributions (log-odds) for each row of `rows`, shape (n_rows, n_features).
+
+    "native" asks the XGBoost booster for its built-in TreeSHAP contributions (pred_contribs),
+    with no explainer object to build. "shap" runs shap.TreeExplainer and is kept for parity checks.
+    """
+    backend = backend or EXPLAIN_BACKEND
+    if backend == "native":
+        booster = loaded.booster
+        with time_stage("explain"): contributions = booster.predict(DMatrix(rows), pred_contribs=True)
+        return contributions[:, :-1]  # the last column is the bias term
+    if backend == "shap":
+        explainer = loaded.explainer
+        with time_stage("explain"): return get_shap_rows(explainer.shap_values(rows))
+    raise ValueError(f"Unknown explanation backend '{backend}'; expected one of {EXPLAIN_BACKENDS}.")
+
+def explanation_parity(loaded, rows: pd.DataFrame) -> float:
+    """Largest absolute difference between the native and SHAP backends on `rows`."""
+    return float(np.max(np.abs(explain(loaded, rows, "native") - explain(loaded, rows, "shap"))))
@@ -0,0 +1,144 @@
+# backend/services/metrics.py
+
+import time
+import threading
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TRAINING_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labelnames: tuple, labelvalues: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra: pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float('inf'): return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class _Metric:
+    """Base for a labelled metric family; children are keyed by label values in declaration order."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames): raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}.")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock: children = sorted(self._children.items())
+        for labelvalues, value in children: lines += self._render_child(labelvalues, value)
+        return lines
+
+    def _render_child(self, labelvalues: tuple, value) -> list:
+        return [f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock: self._children[key] = self._children.get(key, 0) + amount
+
+class Gauge(_Metric):
+    """A settable value; `set_function` makes the (label-less) gauge read a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock: self._children[key] = value
+
+    def set_function(self, function):
+        self._function = function
+
+    def render(self) -> list:
+        if self._function is not None:
+            with self._lock: self._children[()] = self._function()
+        return super().render()
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; each child holds [bucket counts..., sum, count]."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None: child = self._children[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound: child[i] += 1
+            child[-2] += value; child[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the duration of the `with` block, whether or not it raises."""
+        start = time.perf_counter()
+        try: yield
+        finally: self.observe(time.perf_counter() - start, **labels)
+
+    def _render_child(self, labelvalues: tuple, child) -> list:
+        bucket_labels = ['le="%s"' % _format_value(bound) for bound in self.buckets]
+        lines = [f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {count}" for le, count in zip(bucket_labels, child)]
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labelvalues)} {_format_value(child[-2])}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, labelvalues)} {child[-1]}")
+        return lines
+
+class MetricsRegistry:
+    """Holds every metric of the process and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics: raise ValueError(f"Metric {metric.name} is already registered.")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock: metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+registry = MetricsRegistry()
+
+# Hot-path stages of a score request (fetch_inputs, engineer_features, model_load, predict, explain, serialize, ...).
+stage_seconds = registry.register(Histogram("credtech_stage_duration_seconds", "Time spent per scoring stage.", ("stage",)))
+# Upstream calls per data source; failures are counted separately so slow and broken sources are told apart.
+source_seconds = registry.register(Histogram("credtech_source_request_duration_seconds", "Upstream data source call latency.", ("source",)))
+source_errors = registry.register(Counter("credtech_source_errors_total", "Upstream data source calls that failed or returned nothing.", ("source",)))
+source_deadline_misses = registry.register(Counter("credtech_source_deadline_misses_total", "Upstream fetches abandoned at their deadline.", ("source",)))
+source_hedges = registry.register(Counter("credtech_source_hedged_requests_total", "Duplicate upstream calls started because the first was slow.", ("source",)))
+cache_requests = registry.register(Counter("credtech_cache_requests_total", "Cache lookups by cache and result (hit, stale, miss; coalesced counts misses that joined an in-flight load).", ("cache", "result")))
+model_loads = registry.register(Counter("credtech_model_loads_total", "Boosters deserialized into the model registry, by artifact format.", ("format",)))
+training_job_seconds = registry.register(Histogram("credtech_training_job_duration_seconds", "Background training job run time by final status.", ("status",), buckets=TRAINING_BUCKETS))
+training_queue_depth = registry.register(Gauge("credtech_training_queue_depth", "Training jobs queued or running."))
+http_request_seconds = registry.register(Histogram("credtech_http_request_duration_seconds", "API request latency by route, method and status code.", ("route", "method", "status")))
+
+def time_stage(stage: str):
+    """Context manager timing one stage into credtech_stage_duration_seconds."""
+    return stage_seconds.time(stage=stage)
+
+def time_source(source: str):
+    """Context manager timing one upstream call into credtech_source_request_duration_seconds."""
+    return source_seconds.time(source=source)
@@ -0,0 +1,66 @@
+# backend/services/model_artifacts.py
+
+import os
+import json
+import math
+import hashlib
+import logging
+from datetime import datetime, timezone
+import pandas as pd
+import xgboost
+from xgboost import Booster
+
+ARTIFACT_SUFFIX = ".ubj"  # XGBoost's native UBJSON model format
+LEGACY_SUFFIX = ".joblib"
+MANIFEST_VERSION = 1
+
+def manifest_path(model_path: str) -> str:
+    return os.path.splitext(model_path)[0] + ".manifest.json"
+
+def data_hash(X: pd.DataFrame, y: pd.Series) -> str:
+    """Content hash of a training set (values and index), to tell whether two models saw the same data."""
+    return hashlib.sha256(pd.util.hash_pandas_object(X.assign(target=y), index=True).to_numpy().tobytes()).hexdigest()
+
+def build_manifest(model, X: pd.DataFrame, y: pd.Series, auc: float = None, **extra) -> dict:
+    """Describes a trained model: features, training window, metrics, params and data provenance."""
+    dates = X.index.get_level_values(-1) if isinstance(X.index, pd.MultiIndex) else X.index
+    return {
+        "format_version": MANIFEST_VERSION, "xgboost_version": xgboost.__version__, "trained_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "features": list(X.columns), "rows": int(len(X)), "positive_rate": float(y.mean()) if len(y) else None,
+        "training_window": {"start": str(pd.Timestamp(dates.min()).date()), "end": str(pd.Timestamp(dates.max()).date())} if len(dates) else None,
+        "auc": None if auc is None else float(auc), "params": {key: value for key, value in model.get_params().items() if value is not None and not callable(value) and key != 'callbacks'},
+        "data_hash": data_hash(X, y), **extra}
+
+def json_safe(value):
+    """Replaces non-finite floats (e.g. XGBoost's missing=nan) with their string form, recursively, so the manifest stays strict JSON."""
+    if isinstance(value, float) and not math.isfinite(value): return str(value)
+    if isinstance(value, dict): return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)): return [json_safe(item) for item in value]
+    return value
+
+def save_model_artifact(model, model_path: str, manifest: dict):
+    """Writes the booster in native format plus its manifest, each via a temp file and an atomic rename.
+
+    The manifest goes first, so a reader that notices the new booster's mtime also finds its manifest.
+    """
+    suffix = f".{os.getpid()}.tmp"
+    with open(manifest_path(model_path) + suffix, "w") as f: json.dump(json_safe(manifest), f, indent=2, default=str, allow_nan=False)
+    os.replace(manifest_path(model_path) + suffix, manifest_path(model_path))
+    # save_model picks the format from the extension, so the temp name keeps it.
+    tmp_path = f"{os.path.splitext(model_path)[0]}{suffix}{ARTIFACT_SUFFIX}"
+    model.get_booster().save_model(tmp_path); os.replace(tmp_path, model_path)
+
+def read_manifest(model_path: str) -> dict:
+    """Reads an artifact's manifest without touching the model; {} if it has none (e.g. a legacy pickle)."""
+    try:
+        with open(manifest_path(model_path)) as f: return json.load(f)
+    except FileNotFoundError: return {}
+    except (OSError, ValueError) as e:
+        logging.warning(f"Unreadable model manifest for {model_path}: {e}"); return {}
+
+def load_booster(model_path: str) -> Booster:
+    """Loads a booster from a native artifact, or from a legacy joblib-pickled XGBClassifier."""
+    if model_path.endswith(LEGACY_SUFFIX):
+        import joblib
+        return joblib.load(model_path).get_booster()
+    booster = Booster(); booster.load_model(model_path); return booster
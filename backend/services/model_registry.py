@@ -0,0 +1,103 @@
+# backend/services/model_registry.py
+
+import os
+import threading
+import logging
+from collections import OrderedDict
+import numpy as np
+from .model_artifacts import read_manifest, load_booster, LEGACY_SUFFIX
+from .metrics import time_stage, model_loads, cache_requests
+
+class LoadedModel:
+    """A registered model artifact: its manifest up front, its booster on first use.
+
+    The SHAP explainer is built only when the "shap" explanation backend asks for it.
+    """
+
+    def __init__(self, model_path: str, mtime_ns: int, size_bytes: int, manifest: dict = None):
+        self.model_path, self.mtime_ns, self.size_bytes = model_path, mtime_ns, size_bytes
+        self.manifest = manifest or {}
+        self._booster, self._explainer = None, None
+        self._lock = threading.Lock()
+
+    @property
+    def booster(self):
+        if self._booster is None:
+            with self._lock:
+                if self._booster is None:
+                    with time_stage("model_load"): self._booster = load_booster(self.model_path)
+                    model_loads.inc(format="joblib" if self.model_path.endswith(LEGACY_SUFFIX) else "ubj")
+        return self._booster
+
+    @property
+    def feature_names(self) -> list:
+        return self.manifest.get('features') or self.booster.feature_names
+
+    def predict_proba(self, rows) -> np.ndarray:
+        """Positive-class probabilities for `rows`, via inplace_predict (no DMatrix or sklearn wrapper)."""
+        booster = self.booster
+        with time_stage("predict"): return np.asarray(booster.inplace_predict(rows[self.feature_names]))
+
+    @property
+    def explainer(self):
+        if self._explainer is None:
+            import shap
+            self._explainer = shap.TreeExplainer(self.booster)
+        return self._explainer
+
+class ModelRegistry:
+    """In-process LRU registry of models keyed by file path.
+
+    The registry is bounded by entry count and by total serialized size. An entry is reloaded
+    when its file's mtime changes, so a model rewritten by training never serves stale
+    predictions, and `invalidate` drops it eagerly.
+    """
+
+    def __init__(self, max_models: int = 64, max_bytes: int = 256 * 1024 * 1024):
+        self.max_models, self.max_bytes = max_models, max_bytes
+        self._entries = OrderedDict()  # model_path -> LoadedModel
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._load_locks = {}  # model_path -> Lock, so concurrent misses load once
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, model_path: str):
+        """Returns the LoadedModel for `model_path`, loading it on a miss, or None if no file exists."""
+        try: stat = os.stat(model_path)
+        except FileNotFoundError:
+            self.invalidate(model_path); return None
+        entry = self._lookup(model_path, stat.st_mtime_ns)
+        if entry is not None:
+            cache_requests.inc(cache="model_registry", result="hit"); return entry
+        cache_requests.inc(cache="model_registry", result="miss")
+        with self._lock: load_lock = self._load_locks.setdefault(model_path, threading.Lock())
+        with load_lock:
+            entry = self._lookup(model_path, stat.st_mtime_ns)
+            if entry is not None: return entry
+            logging.info(f"Loading model into registry: {model_path}")
+            entry = LoadedModel(model_path, stat.st_mtime_ns, stat.st_size, read_manifest(model_path))
+            self._put(model_path, entry)
+        return entry
+
+    def invalidate(self, model_path: str):
+        with self._lock:
+            entry = self._entries.pop(model_path, None)
+            if entry is not None: self._total_bytes -= entry.size_bytes
+
+    def _lookup(self, model_path: str, mtime_ns: int):
+        with self._lock:
+            entry = self._entries.get(model_path)
+            if entry is None or entry.mtime_ns != mtime_ns: return None
+            self._entries.move_to_end(model_path); return entry
+
+    def _put(self, model_path: str, entry: LoadedModel):
+        with self._lock:
+            previous = self._entries.pop(model_path, None)
+            if previous is not None: self._total_bytes -= previous.size_bytes
+            self._entries[model_path] = entry; self._total_bytes += entry.size_bytes
+            # Always keep the entry just loaded, even if it alone exceeds max_bytes.
+            while len(self._entries) > 1 and (len(self._entries) > self.max_models or self._total_bytes > self.max_bytes):
+                evicted_path, evicted = self._entries.popitem(last=False); self._total_bytes -= evicted.size_bytes
+                logging.info(f"Evicted model from registry: {evicted_path}")
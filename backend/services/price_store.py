@@ -0,0 +1,57 @@
+# backend/services/price_store.py
+
+import os
+import threading
+import logging
+import pandas as pd
+
+class PriceStore:
+    """Local columnar store of daily OHLCV bars: one Parquet file per ticker under `root`.
+
+    Files are read memory-mapped and replaced atomically, so readers never see a partial write.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def path(self, ticker: str) -> str:
+        return os.path.join(self.root, f"{ticker.upper()}.parquet")
+
+    def age_seconds(self, ticker: str):
+        """Seconds since the ticker's file was last written, or None if it has never been stored."""
+        try: return max(0.0, pd.Timestamp.now().timestamp() - os.path.getmtime(self.path(ticker)))
+        except OSError: return None
+
+    def read(self, ticker: str, start=None):
+        """Returns the stored bars (indexed by naive date) from `start` onwards, or None if nothing is stored."""
+        path = self.path(ticker)
+        if not os.path.exists(path): return None
+        try:
+            bars = pd.read_parquet(path, engine="pyarrow", memory_map=True)
+        except Exception as e:
+            logging.error(f"Could not read stored prices for {ticker}: {e}"); return None
+        return bars if start is None else bars[bars.index >= pd.Timestamp(start)]
+
+    def merge(self, ticker: str, new_bars: pd.DataFrame) -> pd.DataFrame:
+        """Upserts `new_bars` (newer values win on overlapping dates) and returns the full stored history."""
+        with self._lock_for(ticker):
+            stored = self.read(ticker)
+            bars = new_bars if stored is None else pd.concat([stored, new_bars])
+            bars = bars[~bars.index.duplicated(keep="last")].sort_index()
+            self._write(ticker, bars); return bars
+
+    def replace(self, ticker: str, bars: pd.DataFrame) -> pd.DataFrame:
+        """Overwrites the ticker's history with `bars`, e.g. after a split re-adjusted every earlier price."""
+        with self._lock_for(ticker):
+            bars = bars[~bars.index.duplicated(keep="last")].sort_index()
+            self._write(ticker, bars); return bars
+
+    def _write(self, ticker: str, bars: pd.DataFrame):
+        path = self.path(ticker); tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        bars.to_parquet(tmp_path, engine="pyarrow"); os.replace(tmp_path, path)
+
+    def _lock_for(self, ticker: str) -> threading.Lock:
+        with self._locks_guard: return self._locks.setdefault(ticker.upper(), threading.Lock())
@@ -2,25 +2,51 @@
 
 import pandas as pd
 import numpy as np
-import joblib
 import os
 import logging
-import optuna
-from optuna.trial import Trial
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
+import threading
+from collections import deque
 from xgboost import XGBClassifier
-import shap
-from sklearn.metrics import roc_auc_score
-from sklearn.model_selection import train_test_split
+from xgboost.callback import TrainingCallback
+from .config import FEATURE_STATE_CACHE_SIZE, MODEL_CACHE_MAX_MODELS, MODEL_CACHE_MAX_BYTES, TRAINING_THREADS_PER_JOB, OPTUNA_STORAGE_URL, OPTUNA_TRIALS, OPTUNA_WARM_START_TRIALS, OPTUNA_N_JOBS, OPTUNA_EARLY_STOPPING_ROUNDS, MODEL_MODE
+from .model_registry import ModelRegistry
+from .model_artifacts import ARTIFACT_SUFFIX, LEGACY_SUFFIX, build_manifest, save_model_artifact
+from .training_jobs import training_jobs, run_in_training_pool
+from .cache import TTLCache
+from .explainer import explain
+from .sentiment import get_sentiment_analyzer, get_sentiment, get_news_features
+from .metrics import time_stage
 
 MODEL_DIR = "backend/ml_models"; os.makedirs(MODEL_DIR, exist_ok=True) 
-optuna.logging.set_verbosity(optuna.logging.WARNING); logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-try: sia = SentimentIntensityAnalyzer()
-except LookupError: import nltk; logging.info("Downloading VADER lexicon..."); nltk.download('vader_lexicon'); sia = SentimentIntensityAnalyzer()
+model_registry = ModelRegistry(max_models=MODEL_CACHE_MAX_MODELS, max_bytes=MODEL_CACHE_MAX_BYTES)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def get_sentiment(text: str):
-    if not text or not isinstance(text, str): return 0.0
-    return sia.polarity_scores(text)['compound']
+def get_optuna():
+    """Imports optuna on first training run; the scoring path never needs it."""
+    import optuna
+    optuna.logging.set_verbosity(optuna.logging.WARNING); return optuna
+
+FEATURE_COLUMNS = ['Close_raw', 'price_change_pct_7d', 'price_change_pct_30d', 'price_change_pct_90d', 'volatility_30d', 'volatility_90d', 'rsi_14d', 'price_to_ma_ratio', 'market_sentiment_90d', 'treasury_rate_change_30d', 'avg_news_sentiment_30d', 'news_volume_30d', 'negative_event_count', 'trailingPE', 'dividendYield', 'debt_to_equity', 'cash_per_share']
+TECHNICAL_FEATURE_COLUMNS = ['price_change_pct_7d', 'price_change_pct_30d', 'price_change_pct_90d', 'volatility_30d', 'volatility_90d', 'rsi_14d', 'price_to_ma_ratio', 'market_sentiment_90d', 'treasury_rate_change_30d', 'avg_news_sentiment_30d', 'news_volume_30d', 'negative_event_count']
+PROFILE_FEATURE_COLUMNS = ['sector_code', 'log_market_cap']
+GLOBAL_FEATURE_COLUMNS = TECHNICAL_FEATURE_COLUMNS + PROFILE_FEATURE_COLUMNS
+SECTORS = ['Basic Materials', 'Communication Services', 'Consumer Cyclical', 'Consumer Defensive', 'Energy', 'Financial Services', 'Healthcare', 'Industrials', 'Real Estate', 'Technology', 'Utilities']
+GLOBAL_MODEL_KEY = "global"
+
+def get_info_features(info: dict):
+    """Maps yfinance company info onto the fundamental feature columns."""
+    return {'trailingPE': info.get('trailingPE'), 'dividendYield': (info.get('dividendYield') or 0) * 100, 'debt_to_equity': info.get('debtToEquity'), 'cash_per_share': info.get('totalCashPerShare')}
+
+def get_profile_features(info: dict):
+    """Sector and size features that let one pooled model tell companies apart; unknown values stay NaN."""
+    sector = info.get('sector'); market_cap = info.get('marketCap')
+    return {'sector_code': float(SECTORS.index(sector)) if sector in SECTORS else np.nan, 'log_market_cap': float(np.log10(market_cap)) if market_cap and market_cap > 0 else np.nan}
+
+def add_profile_features(features: pd.DataFrame, info_by_ticker: dict) -> pd.DataFrame:
+    """Adds PROFILE_FEATURE_COLUMNS to a panel (or per-ticker latest rows) indexed by ticker first."""
+    tickers = features.index.get_level_values(0)
+    profiles = pd.DataFrame([get_profile_features(info_by_ticker.get(ticker) or {}) for ticker in tickers.unique()], index=tickers.unique(), columns=PROFILE_FEATURE_COLUMNS, dtype='float64')
+    return features.assign(**{column: profiles[column].reindex(tickers).to_numpy() for column in PROFILE_FEATURE_COLUMNS})
 
 def engineer_features(yf_data: dict, market_sentiment: float, fred_data: pd.Series, news_data: list):
     if 'historical_data' not in yf_data or not yf_data['historical_data']: return pd.DataFrame()
@@ -42,22 +68,184 @@ def engineer_features(yf_data: dict, market_sentiment: float, fred_data: pd.Seri
     rs = avg_gain / avg_loss.replace(0, np.nan); stock_df['rsi_14d'] = 100 - (100 / (1 + rs)); stock_df['rsi_14d'] = stock_df['rsi_14d'].fillna(50)
     stock_df['ma_90d'] = close_prices.rolling(window=90).mean(); stock_df['price_to_ma_ratio'] = close_prices / stock_df['ma_90d']
     stock_df['market_sentiment_90d'] = market_sentiment
-    avg_sentiment, news_volume, negative_event_count = 0.0, 0, 0
-    if news_data:
-        news_volume = len(news_data); sentiments = [get_sentiment(article.get('title')) for article in news_data if article.get('title')]
-        if sentiments: avg_sentiment = np.mean(sentiments)
-        negative_keywords = ['downgrade', 'lawsuit', 'fraud', 'restructuring', 'crisis', 'investigation', 'scandal', 'debt']
-        for article in news_data:
-            title = article.get('title', '').lower()
-            if any(keyword in title for keyword in negative_keywords): negative_event_count += 1
+    avg_sentiment, news_volume, negative_event_count = get_news_features(news_data)
     stock_df['avg_news_sentiment_30d'] = avg_sentiment; stock_df['news_volume_30d'] = news_volume; stock_df['negative_event_count'] = negative_event_count
-    info = yf_data.get('info', {}); stock_df['trailingPE'] = info.get('trailingPE'); stock_df['dividendYield'] = (info.get('dividendYield') or 0) * 100
-    stock_df['debt_to_equity'] = info.get('debtToEquity'); stock_df['cash_per_share'] = info.get('totalCashPerShare')
-    feature_columns = ['Close_raw', 'price_change_pct_7d', 'price_change_pct_30d', 'price_change_pct_90d', 'volatility_30d', 'volatility_90d', 'rsi_14d', 'price_to_ma_ratio', 'market_sentiment_90d', 'treasury_rate_change_30d', 'avg_news_sentiment_30d', 'news_volume_30d', 'negative_event_count', 'trailingPE', 'dividendYield', 'debt_to_equity', 'cash_per_share']
-    features = stock_df[feature_columns].copy()
+    for column, value in get_info_features(yf_data.get('info', {})).items(): stock_df[column] = value
+    features = stock_df[FEATURE_COLUMNS].copy()
     features.replace([np.inf, -np.inf], 0, inplace=True); features.fillna({'price_to_ma_ratio': 1.0}, inplace=True); features.fillna(0, inplace=True) 
     return features
 
+def build_price_panel(yf_data_by_ticker: dict) -> pd.DataFrame:
+    """Stacks each ticker's `historical_data` into one frame indexed by (ticker, date)."""
+    frames = {ticker: pd.DataFrame.from_dict(yf_data['historical_data'], orient='index') for ticker, yf_data in yf_data_by_ticker.items() if yf_data and yf_data.get('historical_data')}
+    if not frames: return pd.DataFrame()
+    panel = pd.concat(frames, names=['ticker', 'date'])
+    panel.index = pd.MultiIndex.from_arrays([panel.index.get_level_values(0), pd.to_datetime(panel.index.get_level_values(1))], names=['ticker', 'date'])
+    return panel.sort_index()
+
+def engineer_features_panel(price_panel: pd.DataFrame, market_sentiment: float, fred_data: pd.Series, news_by_ticker: dict = None, info_by_ticker: dict = None) -> pd.DataFrame:
+    """Panel mode of engineer_features: all tickers' FEATURE_COLUMNS in one grouped, vectorized pass.
+
+    `price_panel` is indexed by (ticker, date) with a Close column, as built by build_price_panel;
+    a long frame with 'ticker' and 'date' columns is accepted too. FRED is aligned once for the
+    whole panel. `panel.xs(ticker)` matches engineer_features for that ticker.
+    """
+    if price_panel is None or price_panel.empty: return pd.DataFrame(columns=FEATURE_COLUMNS)
+    if not isinstance(price_panel.index, pd.MultiIndex): price_panel = price_panel.set_index(['ticker', 'date'])
+    tickers = price_panel.index.get_level_values(0); dates = pd.to_datetime(price_panel.index.get_level_values(1))
+    close_prices = pd.Series(pd.to_numeric(price_panel['Close'], errors='coerce').to_numpy(), index=pd.MultiIndex.from_arrays([tickers, dates], names=['ticker', 'date'])).sort_index()
+    by_ticker = close_prices.groupby(level='ticker', sort=False)
+    def rolling(series: pd.Series, window: int, stat: str, min_periods: int = None) -> pd.Series:
+        return getattr(series.groupby(level='ticker', sort=False).rolling(window=window, min_periods=min_periods), stat)().droplevel(0)
+    features = pd.DataFrame(index=close_prices.index)
+    features['Close_raw'] = close_prices
+    if fred_data is not None:
+        # Values land only on dates FRED reported, then forward-fill within each ticker, as the per-ticker left merge does.
+        fred_series = pd.Series(fred_data, dtype='float64'); fred_series.index = pd.to_datetime(fred_series.index)
+        fred_series = fred_series[~fred_series.index.duplicated(keep='last')]
+        treasury = pd.Series(fred_series.reindex(close_prices.index.get_level_values('date')).to_numpy(), index=close_prices.index)
+        treasury = treasury.groupby(level='ticker', sort=False).ffill()
+        features['treasury_rate_change_30d'] = treasury.groupby(level='ticker', sort=False).diff(periods=30).fillna(0)
+    else:
+        features['treasury_rate_change_30d'] = 0
+    for periods in (7, 30, 90): features[f'price_change_pct_{periods}d'] = by_ticker.pct_change(periods=periods).fillna(0) * 100
+    features['volatility_30d'] = rolling(close_prices, 30, 'std').fillna(0); features['volatility_90d'] = rolling(close_prices, 90, 'std').fillna(0)
+    delta = by_ticker.diff(); gain = delta.clip(lower=0).fillna(0); loss = -delta.clip(upper=0).fillna(0)
+    avg_gain = rolling(gain, 14, 'mean', min_periods=1); avg_loss = rolling(loss, 14, 'mean', min_periods=1)
+    rs = avg_gain / avg_loss.replace(0, np.nan); features['rsi_14d'] = (100 - (100 / (1 + rs))).fillna(50)
+    features['price_to_ma_ratio'] = close_prices / rolling(close_prices, 90, 'mean')
+    features['market_sentiment_90d'] = market_sentiment
+    # Per-ticker scalars are computed once per ticker and broadcast onto its rows.
+    row_tickers = features.index.get_level_values('ticker')
+    news_by_ticker, info_by_ticker = news_by_ticker or {}, info_by_ticker or {}
+    news = pd.DataFrame([get_news_features(news_by_ticker.get(ticker)) for ticker in row_tickers.unique()], index=row_tickers.unique(), columns=['avg_news_sentiment_30d', 'news_volume_30d', 'negative_event_count'])
+    info = pd.DataFrame([get_info_features(info_by_ticker.get(ticker) or {}) for ticker in row_tickers.unique()], index=row_tickers.unique(), dtype='float64')
+    for column in news.columns: features[column] = news[column].reindex(row_tickers).to_numpy()
+    for column in info.columns: features[column] = info[column].reindex(row_tickers).to_numpy()
+    features = features[FEATURE_COLUMNS]
+    features = features.replace([np.inf, -np.inf], 0).fillna({'price_to_ma_ratio': 1.0}).fillna(0)
+    return features
+
+def treasury_rates_on(fred_data: pd.Series, dates: pd.DatetimeIndex) -> list:
+    """FRED readings on exactly `dates` (None where FRED reported nothing), without converting the whole series to a lookup."""
+    if fred_data is None or not len(fred_data): return [None] * len(dates)
+    fred_series = pd.Series(fred_data, dtype='float64')
+    if not isinstance(fred_series.index, pd.DatetimeIndex): fred_series.index = pd.to_datetime(fred_series.index)
+    matches = fred_series[fred_series.index.isin(dates)]
+    matches = matches[~matches.index.duplicated(keep='last')].to_dict()
+    return [matches.get(date) for date in dates]
+
+class IncrementalFeatureState:
+    """Rolling-window state for one ticker that absorbs new daily bars without replaying its history.
+
+    Only the closes and forward-filled treasury readings the longest window needs are kept, so
+    append() costs O(window), and latest_features() equals the last row engineer_features
+    would build from the full history (to floating-point rounding). Appending a bar for the
+    last seen date replaces it, which covers intraday updates of today's bar.
+    """
+
+    PRICE_WINDOW = 91  # the 90-day return needs the close 90 bars back
+    TREASURY_WINDOW = 31  # treasury_rate_change_30d is a 30-row diff
+
+    def __init__(self, market_sentiment: float = 0.0, news_data: list = None, info: dict = None, has_fred: bool = True):
+        # One spare slot each, so replacing the latest bar never loses the oldest one a window needs.
+        self.closes = deque(maxlen=self.PRICE_WINDOW + 1)
+        self.treasury = deque(maxlen=self.TREASURY_WINDOW + 1)
+        self.bar_count, self.last_date, self.previous_date, self.has_fred = 0, None, None, has_fred
+        self.lock = threading.Lock()
+        self.set_context(market_sentiment, news_data, info)
+
+    @classmethod
+    def from_history(cls, yf_data: dict, market_sentiment: float, fred_data: pd.Series, news_data: list):
+        state = cls(market_sentiment, news_data, yf_data.get('info', {}), has_fred=fred_data is not None)
+        state.append_bars(yf_data['historical_data'], fred_data)
+        return state
+
+    def set_context(self, market_sentiment: float, news_data: list = None, info: dict = None):
+        """Refreshes the per-ticker scalars that are broadcast onto every row."""
+        self.market_sentiment = market_sentiment
+        self.news_features = get_news_features(news_data)
+        self.info_features = get_info_features(info or {})
+
+    def append_bars(self, historical_data: dict, fred_data: pd.Series = None):
+        """Appends every bar in a date-keyed `historical_data` dict that is not older than the last one seen.
+
+        Keys are 'YYYY-MM-DD' strings in ascending order, as get_yahoo_finance_data builds them, so
+        once the state is seeded only the dict's tail is walked and no already-seen date is parsed.
+        """
+        if self.last_date is None:
+            dates = sorted(historical_data)
+        else:
+            last_seen, dates = self.last_date.strftime('%Y-%m-%d'), []
+            for date in reversed(historical_data):
+                if date < last_seen: break
+                dates.append(date)
+            dates.reverse()
+        if not dates: return
+        timestamps = pd.DatetimeIndex(dates)
+        for date, timestamp, treasury_rate in zip(dates, timestamps, treasury_rates_on(fred_data, timestamps)):
+            self.append(timestamp, historical_data[date]['Close'], treasury_rate)
+
+    def append(self, date, close: float, treasury_rate: float = None):
+        date = pd.Timestamp(date)
+        if self.last_date is not None and date < self.last_date: raise ValueError(f"Bar for {date.date()} is older than {self.last_date.date()}.")
+        close = float(pd.to_numeric(close, errors='coerce'))
+        treasury_rate = np.nan if treasury_rate is None else float(treasury_rate)
+        if self.last_date is not None and date == self.last_date:
+            self.closes.pop(); self.treasury.pop()
+        else:
+            self.bar_count += 1; self.previous_date = self.last_date
+        previous_rate = self.treasury[-1] if self.treasury else np.nan
+        self.closes.append(close); self.treasury.append(previous_rate if np.isnan(treasury_rate) else treasury_rate)
+        self.last_date = date
+
+    def matches(self, historical_data: dict) -> bool:
+        """False if the last complete bar absorbed has changed since, e.g. after the price store was re-adjusted for a split."""
+        if self.previous_date is None: return True
+        bar = historical_data.get(self.previous_date.strftime('%Y-%m-%d'))
+        return bar is not None and bool(np.isclose(float(pd.to_numeric(bar['Close'], errors='coerce')), self.closes[-2], rtol=1e-9, atol=0, equal_nan=True))
+
+    def latest_features(self) -> pd.DataFrame:
+        """Returns the newest bar's FEATURE_COLUMNS as a one-row frame."""
+        if not self.closes: return pd.DataFrame(columns=FEATURE_COLUMNS)
+        closes = np.asarray(self.closes, dtype='float64'); close = closes[-1]; n = len(closes)
+        row = {'Close_raw': close}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for periods in (7, 30, 90): row[f'price_change_pct_{periods}d'] = (close / closes[-1 - periods] - 1) * 100 if n > periods else 0.0
+            for window in (30, 90): row[f'volatility_{window}d'] = closes[-window:].std(ddof=1) if n >= window else 0.0
+            # Until 15 bars exist, the first bar's missing delta counts as a zero gain/loss, as fillna(0) does in the batch path.
+            deltas = np.diff(closes[-15:]) if n >= 15 else np.concatenate([[0.0], np.diff(closes)])
+            avg_gain = np.clip(deltas, 0, None).mean(); avg_loss = -np.clip(deltas, None, 0).mean()
+            row['rsi_14d'] = 100 - (100 / (1 + avg_gain / avg_loss)) if avg_loss != 0 else 50.0
+            row['price_to_ma_ratio'] = close / closes[-90:].mean() if n >= 90 else np.nan
+        row['market_sentiment_90d'] = self.market_sentiment
+        treasury = np.asarray(self.treasury, dtype='float64')
+        row['treasury_rate_change_30d'] = treasury[-1] - treasury[-31] if self.has_fred and len(treasury) > 30 else 0.0
+        row['avg_news_sentiment_30d'], row['news_volume_30d'], row['negative_event_count'] = self.news_features
+        row.update(self.info_features)
+        features = pd.DataFrame([row], index=[self.last_date], columns=FEATURE_COLUMNS, dtype='float64')
+        return features.replace([np.inf, -np.inf], 0).fillna({'price_to_ma_ratio': 1.0}).fillna(0)
+
+feature_states = TTLCache(maxsize=FEATURE_STATE_CACHE_SIZE, ttl=float('inf'), name="feature_state")
+
+def update_feature_state(ticker: str, yf_data: dict, market_sentiment: float, fred_data: pd.Series, news_data: list) -> pd.DataFrame:
+    """Incremental counterpart of engineer_features(...).iloc[-1:] for repeated rescoring of a ticker.
+
+    The first call seeds the ticker's state from its full history; later calls only absorb bars
+    from the last seen date onwards and refresh the news, market and fundamental scalars. A state
+    whose history no longer matches the data (re-adjusted prices) is seeded again.
+    """
+    if not yf_data or not yf_data.get('historical_data'): return pd.DataFrame(columns=FEATURE_COLUMNS)
+    state = feature_states.get(ticker)
+    if state is not None and not state.matches(yf_data['historical_data']): state = None
+    if state is None:
+        state = IncrementalFeatureState.from_history(yf_data, market_sentiment, fred_data, news_data)
+        feature_states.set(ticker, state); return state.latest_features()
+    with state.lock:
+        state.append_bars(yf_data['historical_data'], fred_data)
+        state.set_context(market_sentiment, news_data, yf_data.get('info', {}))
+        return state.latest_features()
+
 def get_fundamental_score(yf_data: dict):
     info = yf_data.get('info', {}); score = 100; explanation = []
     dte = info.get('debtToEquity')
@@ -77,76 +265,265 @@ def get_fundamental_score(yf_data: dict):
         score -= 10; explanation.append({'feature': 'Cash per Share', 'value': cash_ps, 'impact': 1.0})
     logging.info(f"Fundamental Score calculated: {score}"); return max(0, score), explanation
 
-def get_heuristic_assessment(features: pd.DataFrame, yf_data: dict) -> dict:
-    logging.info("ML model training failed. Generating heuristic assessment.")
+def get_heuristic_assessment(features: pd.DataFrame, yf_data: dict, training_job: dict = None) -> dict:
+    if training_job is None: logging.info("ML model training failed. Generating heuristic assessment.")
+    else: logging.info(f"Model for {training_job['ticker']} is training (job {training_job['job_id']}). Generating heuristic assessment.")
     score, explanation = get_fundamental_score(yf_data)
     latest_sentiment = features['avg_news_sentiment_30d'].iloc[-1]
-    return {"stability_score": "N/A", "explanation": explanation, "assessment_type": "Heuristic", "latest_sentiment": latest_sentiment, "all_features": features.to_dict(orient='index')}
+    result = {"stability_score": "N/A", "fundamental_score": score, "explanation": explanation, "assessment_type": "Heuristic", "latest_sentiment": latest_sentiment, "all_features": features}
+    if training_job is not None: result["model_status"] = "training"; result["training_job"] = training_job
+    return result
 
-def train_technical_model(features: pd.DataFrame, ticker: str):
-    model_path = os.path.join(MODEL_DIR, f"xgb_scorer_{ticker}.joblib")
-    logging.info(f"Starting final training for {ticker} with composite risk target...")
+def get_artifact_path(ticker: str):
+    return os.path.join(MODEL_DIR, f"xgb_scorer_{ticker}{ARTIFACT_SUFFIX}")
+
+def get_model_path(ticker: str):
+    """Path of the model to serve: the native artifact, or a legacy joblib pickle until the ticker is retrained."""
+    artifact_path = get_artifact_path(ticker)
+    if os.path.exists(artifact_path): return artifact_path
+    legacy_path = os.path.join(MODEL_DIR, f"xgb_scorer_{ticker}{LEGACY_SUFFIX}")
+    return legacy_path if os.path.exists(legacy_path) else artifact_path
+
+def global_model_enabled() -> bool:
+    """MODEL_MODE 'auto' switches to the pooled model as soon as one has been trained."""
+    return MODEL_MODE == "global" or (MODEL_MODE == "auto" and os.path.exists(get_model_path(GLOBAL_MODEL_KEY)))
+
+def resolve_model(ticker: str):
+    """Returns (loaded_model, scope) for a ticker, where scope is "ticker" or "global", or (None, None).
+
+    A per-ticker model, where one exists, acts as a fine-tune over the pooled model.
+    """
+    loaded = model_registry.get(get_model_path(ticker))
+    if loaded is not None: return loaded, "ticker"
+    if global_model_enabled():
+        loaded = model_registry.get(get_model_path(GLOBAL_MODEL_KEY))
+        if loaded is not None: return loaded, "global"
+    return None, None
+
+def warm_up(tickers: list = ()) -> int:
+    """Preloads what first requests would otherwise pay for: the VADER analyzer and the boosters of `tickers` and the pooled model.
+
+    Returns the number of models loaded.
+    """
+    get_sentiment_analyzer()
+    keys = [ticker.upper() for ticker in tickers] + ([GLOBAL_MODEL_KEY] if global_model_enabled() else [])
+    loaded = 0
+    for key in keys:
+        entry = model_registry.get(get_model_path(key))
+        if entry is None: continue
+        entry.booster; loaded += 1
+    logging.info(f"Warm-up loaded {loaded} of {len(keys)} models."); return loaded
+
+class OptunaPruningCallback(TrainingCallback):
+    """Reports validation AUC to an Optuna trial during boosting and aborts the fit once the pruner gives up on it."""
+
+    def __init__(self, trial, report_every: int = 10):
+        self.trial, self.report_every = trial, report_every
+
+    def after_iteration(self, model, epoch: int, evals_log) -> bool:
+        if epoch % self.report_every: return False
+        self.trial.report(evals_log['validation_0']['auc'][-1], step=epoch)
+        if self.trial.should_prune(): raise get_optuna().TrialPruned(f"Pruned at boosting round {epoch}.")
+        return False
+
+_study_storage = None
+_study_storage_lock = threading.Lock()
+
+def get_study_storage():
+    """Returns this process's Optuna storage for OPTUNA_STORAGE_URL (None for in-memory studies), creating it on first use.
+
+    Creating an RDB storage creates or upgrades its schema, so the API process calls this before
+    handing any job to the training pool; otherwise concurrent first jobs race on the migration.
+    """
+    global _study_storage
+    if not OPTUNA_STORAGE_URL: return None
+    with _study_storage_lock:
+        if _study_storage is None:
+            optuna = get_optuna()
+            if OPTUNA_STORAGE_URL.startswith("journal:"):
+                try: from optuna.storages.journal import JournalFileBackend
+                except ImportError: JournalFileBackend = optuna.storages.JournalFileStorage  # optuna < 4.0
+                _study_storage = optuna.storages.JournalStorage(JournalFileBackend(OPTUNA_STORAGE_URL[len("journal:"):]))
+            else:
+                _study_storage = optuna.storages.RDBStorage(OPTUNA_STORAGE_URL)
+        return _study_storage
+
+def load_study(ticker: str):
+    """Opens the ticker's persistent Optuna study (in memory if OPTUNA_STORAGE_URL is empty)."""
+    return get_optuna().create_study(study_name=f"xgb_scorer_{ticker}", storage=get_study_storage(), direction="maximize", load_if_exists=True)
+
+def new_run_study():
+    """An in-memory study for one training run, so the median pruner only compares trials scored on the same data."""
+    optuna = get_optuna()
+    return optuna.create_study(direction="maximize", pruner=optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=20))
+
+def add_risk_target(features: pd.DataFrame):
+    """Adds the composite risk target: a >5% drop over the next 30 bars with above-average volatility."""
     features['future_volatility_30d'] = features['Close_raw'].rolling(window=30).std().shift(-30); features['future_return_30d'] = (features['Close_raw'].shift(-30) / features['Close_raw']) - 1
     stock_volatility_avg = features['volatility_30d'].mean()
     is_negative_return = features['future_return_30d'] < -0.05
     is_high_volatility = features['future_volatility_30d'] > stock_volatility_avg
     features['target'] = (is_negative_return & is_high_volatility).astype(int)
-    features.dropna(inplace=True) 
+    features.dropna(inplace=True)
+    return features
+
+def train_technical_model(features: pd.DataFrame, ticker: str):
+    logging.info(f"Starting final training for {ticker} with composite risk target...")
+    features = add_risk_target(features)
     if len(features) < 100 or features['target'].nunique() < 2:
         logging.warning("Not enough data or only one class present for robust tuning."); return None
-    technical_feature_cols = ['price_change_pct_7d', 'price_change_pct_30d', 'price_change_pct_90d', 'volatility_30d', 'volatility_90d', 'rsi_14d', 'price_to_ma_ratio', 'market_sentiment_90d', 'treasury_rate_change_30d', 'avg_news_sentiment_30d', 'news_volume_30d', 'negative_event_count']
-    X = features[technical_feature_cols]; y = features['target']
+    return fit_and_save_model(features[TECHNICAL_FEATURE_COLUMNS], features['target'], ticker)
+
+def train_global_model(features_panel: pd.DataFrame, info_by_ticker: dict):
+    """Trains the pooled cross-sectional model on a (ticker, date) feature panel from engineer_features_panel.
+
+    The target is built within each ticker, so no future window crosses from one company into
+    another, and the sector and size features are added to the technical ones.
+    """
+    tickers = features_panel.index.get_level_values('ticker').unique()
+    logging.info(f"Starting global model training on {len(tickers)} tickers and {len(features_panel)} rows...")
+    features = pd.concat({ticker: add_risk_target(features_panel.xs(ticker).copy()) for ticker in tickers}, names=['ticker', 'date'])
+    if len(features) < 100 or features['target'].nunique() < 2:
+        logging.warning("Not enough data or only one class present for robust tuning."); return None
+    features = add_profile_features(features, info_by_ticker)
+    return fit_and_save_model(features[GLOBAL_FEATURE_COLUMNS], features['target'], GLOBAL_MODEL_KEY)
+
+def fit_and_save_model(X: pd.DataFrame, y: pd.Series, ticker: str):
+    """Tunes an XGBClassifier on (X, y) with the ticker's Optuna study, fits it on all rows and saves it."""
+    from sklearn.metrics import roc_auc_score
+    from sklearn.model_selection import train_test_split
+    optuna = get_optuna()
+    model_path = get_artifact_path(ticker)
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, stratify=y, random_state=42)
     scale_pos_weight = (y_train == 0).sum() / (y_train == 1).sum() if (y_train == 1).sum() > 0 else 1
-    def objective(trial: Trial) -> float:
-        X_train_part, X_val, y_train_part, y_val = train_test_split(X_train, y_train, test_size=0.25, stratify=y_train, random_state=42)
-        params = {'objective': 'binary:logistic', 'eval_metric': 'logloss', 'use_label_encoder': False, 'n_estimators': trial.suggest_int('n_estimators', 100, 300, step=50), 'max_depth': trial.suggest_int('max_depth', 3, 7), 'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.2), 'subsample': trial.suggest_float('subsample', 0.6, 1.0), 'colsample_bytree': trial.suggest_float('colsample_bytree', 0.6, 1.0), 'scale_pos_weight': scale_pos_weight}
-        model = XGBClassifier(**params); model.fit(X_train_part, y_train_part, verbose=False)
+    # One fixed validation split for every trial, so trial scores are comparable and prunable.
+    X_train_part, X_val, y_train_part, y_val = train_test_split(X_train, y_train, test_size=0.25, stratify=y_train, random_state=42)
+    def objective(trial) -> float:
+        params = {'objective': 'binary:logistic', 'eval_metric': 'auc', 'use_label_encoder': False, 'n_estimators': trial.suggest_int('n_estimators', 100, 300, step=50), 'max_depth': trial.suggest_int('max_depth', 3, 7), 'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.2), 'subsample': trial.suggest_float('subsample', 0.6, 1.0), 'colsample_bytree': trial.suggest_float('colsample_bytree', 0.6, 1.0), 'scale_pos_weight': scale_pos_weight}
+        model = XGBClassifier(n_jobs=TRAINING_THREADS_PER_JOB, early_stopping_rounds=OPTUNA_EARLY_STOPPING_ROUNDS, callbacks=[OptunaPruningCallback(trial)], **params)
+        model.fit(X_train_part, y_train_part, eval_set=[(X_val, y_val)], verbose=False)
+        trial.set_user_attr('best_iteration', int(model.best_iteration))
         y_pred_proba = model.predict_proba(X_val)[:, 1]; return float(roc_auc_score(y_val, y_pred_proba))
-    study = optuna.create_study(direction="maximize"); study.optimize(objective, n_trials=25)
-    best_params = study.best_params; logging.info(f"Best Parameters Found by Optuna: {best_params}")
-    final_model = XGBClassifier(objective='binary:logistic', eval_metric='logloss', use_label_encoder=False, scale_pos_weight=scale_pos_weight, **best_params)
+    persistent_study = load_study(ticker)
+    previous = [t for t in persistent_study.trials if t.state == optuna.trial.TrialState.COMPLETE]
+    # Earlier runs scored their trials on older data, so this run searches in a study of its own and
+    # only the parameters carry over; its trials are appended to the persistent study afterwards.
+    study = new_run_study()
+    if previous:
+        # Warm start: re-evaluate the previous best parameters on the new data and search around them.
+        study.enqueue_trial(max(previous, key=lambda t: t.value).params)
+    n_trials = OPTUNA_WARM_START_TRIALS if previous else OPTUNA_TRIALS
+    study.optimize(objective, n_trials=n_trials, n_jobs=OPTUNA_N_JOBS)
+    persistent_study.add_trials(study.trials)
+    this_run = [t for t in study.trials if t.state == optuna.trial.TrialState.COMPLETE]
+    if not this_run:
+        logging.warning(f"No Optuna trial completed for {ticker}."); return None
+    best_trial = max(this_run, key=lambda t: t.value)
+    best_params = dict(best_trial.params); best_params['n_estimators'] = best_trial.user_attrs.get('best_iteration', best_params['n_estimators'] - 1) + 1
+    pruned = sum(t.state == optuna.trial.TrialState.PRUNED for t in study.trials)
+    logging.info(f"Optuna ran {n_trials} trials for {ticker} ({pruned} pruned, warm start: {bool(previous)}), best validation AUC {best_trial.value:.4f}.")
+    logging.info(f"Best Parameters Found by Optuna: {best_params}")
+    final_model = XGBClassifier(objective='binary:logistic', eval_metric='logloss', use_label_encoder=False, scale_pos_weight=scale_pos_weight, n_jobs=TRAINING_THREADS_PER_JOB, **best_params)
     final_model.fit(X_train, y_train)
+    auc = None
     if not X_test.empty and y_test.nunique() > 1:
         auc = roc_auc_score(y_test, final_model.predict_proba(X_test)[:, 1])
         logging.info(f"--- MODEL VALIDATION METRICS (FINAL) ---"); logging.info(f"Final Test Set AUC Score for {ticker}: {auc:.4f}"); logging.info(f"-------------------------------------------")
     logging.info(f"Training final model for {ticker} on all data..."); final_model.fit(X, y)
-    joblib.dump(final_model, model_path); logging.info(f"Model for {ticker} trained and saved to {model_path}"); return final_model
+    # Written next to the live files and renamed over them, so readers never see a partial model.
+    save_model_artifact(final_model, model_path, build_manifest(final_model, X, y, auc, model_key=ticker, validation_auc=best_trial.value, optuna_trials=n_trials))
+    model_registry.invalidate(model_path); logging.info(f"Model for {ticker} trained and saved to {model_path}"); return final_model
+
+def train_model_file(features: pd.DataFrame, ticker: str):
+    """Training-process entry point: returns the saved model's path (or None), never the model itself."""
+    return get_model_path(ticker) if train_technical_model(features, ticker) is not None else None
 
-def get_score_and_explanation(ticker: str, yf_data: dict, market_sentiment: float, fred_data: pd.Series, news_data: list):
-    all_features = engineer_features(yf_data, market_sentiment, fred_data, news_data)
+def train_technical_model_isolated(features: pd.DataFrame, ticker: str):
+    """Trains a ticker's model in the training process pool and refreshes the registry entry."""
+    get_study_storage()  # schema created here, once, not by the first few training processes at the same time
+    model_path = run_in_training_pool(train_model_file, features, ticker)
+    if model_path is not None: model_registry.invalidate(model_path)
+    return model_path
+
+def get_score_and_explanation(ticker: str, yf_data: dict, market_sentiment: float, fred_data: pd.Series, news_data: list, explain_backend: str = None):
+    with time_stage("engineer_features"): all_features = engineer_features(yf_data, market_sentiment, fred_data, news_data)
     if all_features.empty: return {"error": "Could not engineer features."}
 
     latest_sentiment = all_features['avg_news_sentiment_30d'].iloc[-1]
     fundamental_score, fund_explanation = get_fundamental_score(yf_data)
-    model_path = os.path.join(MODEL_DIR, f"xgb_scorer_{ticker}.joblib")
-    model = None
-    if not os.path.exists(model_path):
-        model = train_technical_model(all_features.copy(), ticker=ticker)
-    else:
-        model = joblib.load(model_path)
-    
-    if model is None:
-        return get_heuristic_assessment(all_features, yf_data)
+    loaded, model_scope = resolve_model(ticker)
+    if loaded is None:
+        if global_model_enabled(): return get_heuristic_assessment(all_features, yf_data)
+        # Cold start: train off the request path and answer with the fundamentals for now.
+        job = training_jobs.submit(ticker, train_technical_model_isolated, all_features.copy(), ticker)
+        return get_heuristic_assessment(all_features, yf_data, training_job=job)
 
-    technical_feature_cols = model.get_booster().feature_names
-    latest_tech_features = all_features[technical_feature_cols].iloc[-1:]
+    latest_tech_features = all_features.iloc[-1:].assign(**get_profile_features(yf_data.get('info', {})))[loaded.feature_names]
     
-    risk_probability = model.predict_proba(latest_tech_features)[:, 1][0]
+    risk_probability = loaded.predict_proba(latest_tech_features)[0]
+    contributions = explain(loaded, latest_tech_features, explain_backend)
+    result = build_ml_result(risk_probability, latest_tech_features.iloc[0], contributions[0], fundamental_score, fund_explanation, latest_sentiment, all_features)
+    result["model_scope"] = model_scope; return result
+
+def build_ml_result(risk_probability: float, feature_row: pd.Series, contributions, fundamental_score: int, fund_explanation: list, latest_sentiment: float, all_features: pd.DataFrame = None) -> dict:
     technical_penalty = int(risk_probability * 50)
     logging.info(f"Technical model risk probability: {risk_probability:.2f}, resulting in penalty of: {technical_penalty}")
 
     final_score = fundamental_score - technical_penalty
     final_score = max(0, final_score)
 
-    explainer = shap.TreeExplainer(model); shap_values = explainer.shap_values(latest_tech_features)
-    shap_values_for_class_1 = shap_values[0] if len(np.array(shap_values).shape) == 3 else shap_values
-    shap_values_flat = shap_values_for_class_1[0]
-
-    feature_names = latest_tech_features.columns; feature_values = latest_tech_features.iloc[0].values
-    explanation = [{"feature": name, "value": round(float(val), 2), "impact": round(float(shap), 2)} for name, val, shap in zip(feature_names, feature_values, shap_values_flat)]
+    explanation = [{"feature": name, "value": round(float(val), 2), "impact": round(float(shap), 2)} for name, val, shap in zip(feature_row.index, feature_row.values, contributions)]
     
     for item in fund_explanation: explanation.append(item)
     explanation.sort(key=lambda x: abs(x['impact']), reverse=True)
     
-    return {"stability_score": final_score, "technical_score": int((1-risk_probability)*100), "fundamental_score": fundamental_score, "explanation": explanation, "assessment_type": "ML_Model", "latest_sentiment": latest_sentiment, "all_features": all_features.to_dict(orient='index')}
\ No newline at end of file
+    result = {"stability_score": final_score, "technical_score": int((1-risk_probability)*100), "risk_probability": round(float(risk_probability), 4), "fundamental_score": fundamental_score, "explanation": explanation, "assessment_type": "ML_Model", "latest_sentiment": latest_sentiment}
+    if all_features is not None: result["all_features"] = all_features
+    return result
+
+def score_batch(yf_data_by_ticker: dict, market_sentiment: float, fred_data: pd.Series, news_by_ticker: dict, include_features: bool = False, explain_backend: str = None) -> dict:
+    """Scores many tickers together and returns {ticker: result} shaped like get_score_and_explanation.
+
+    Models only read each ticker's latest row. Without `include_features`, tickers that have a model
+    get it from their incremental feature state, so rescoring a watchlist costs O(window) per
+    ticker; full histories go through one engineer_features_panel pass, and only for the feature
+    tables asked for and for tickers without a model. Tickers are then grouped by model so each
+    model (per-ticker or the pooled one) runs predict_proba and explanations once over all of its
+    rows. Tickers without a model get the heuristic assessment and a queued training job, as in
+    the single-ticker path.
+    """
+    info_by_ticker = {ticker: yf_data.get('info', {}) for ticker, yf_data in yf_data_by_ticker.items()}
+    resolved = {ticker: resolve_model(ticker) for ticker in yf_data_by_ticker}
+    full = [ticker for ticker, (loaded, _) in resolved.items() if include_features or loaded is None]
+    panel = pd.DataFrame()
+    if full:
+        with time_stage("engineer_features_panel"): panel = engineer_features_panel(build_price_panel({ticker: yf_data_by_ticker[ticker] for ticker in full}), market_sentiment, fred_data, news_by_ticker, info_by_ticker)
+    latest_rows = [panel.groupby(level='ticker', sort=False).tail(1).droplevel('date')] if not panel.empty else []
+    with time_stage("incremental_features"):
+        for ticker in yf_data_by_ticker.keys() - set(full):
+            row = update_feature_state(ticker, yf_data_by_ticker[ticker], market_sentiment, fred_data, (news_by_ticker or {}).get(ticker))
+            if not row.empty: latest_rows.append(row.set_axis([ticker]))
+    latest = add_profile_features(pd.concat(latest_rows), info_by_ticker) if latest_rows else pd.DataFrame()
+    available = set(latest.index)
+    results, groups = {}, {}
+    for ticker, yf_data in yf_data_by_ticker.items():
+        if ticker not in available:
+            results[ticker] = {"error": "Could not engineer features."}; continue
+        loaded, model_scope = resolved[ticker]
+        if loaded is None:
+            features = panel.xs(ticker).rename_axis(None)
+            job = None if global_model_enabled() else training_jobs.submit(ticker, train_technical_model_isolated, features.copy(), ticker)
+            results[ticker] = get_heuristic_assessment(features, yf_data, training_job=job)
+            if not include_features: results[ticker].pop("all_features")
+            continue
+        groups.setdefault(ticker if model_scope == "ticker" else GLOBAL_MODEL_KEY, (loaded, model_scope, []))[2].append(ticker)
+    for loaded, model_scope, tickers in groups.values():
+        rows = latest.loc[tickers, loaded.feature_names]
+        probabilities = loaded.predict_proba(rows)
+        contributions = explain(loaded, rows, explain_backend)
+        for i, ticker in enumerate(tickers):
+            fundamental_score, fund_explanation = get_fundamental_score(yf_data_by_ticker[ticker])
+            all_features = panel.xs(ticker).rename_axis(None) if include_features else None
+            results[ticker] = build_ml_result(probabilities[i], rows.iloc[i], contributions[i], fundamental_score, fund_explanation, latest.at[ticker, 'avg_news_sentiment_30d'], all_features)
+            results[ticker]["model_scope"] = model_scope
+    return results
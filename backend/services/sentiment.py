@@ -0,0 +1,63 @@
+# backend/services/sentiment.py
+
+import re
+import hashlib
+import logging
+import threading
+import numpy as np
+from .config import NLTK_DATA_DIR, SENTIMENT_CACHE_SIZE
+from .cache import TTLCache
+
+NEGATIVE_KEYWORDS = ['downgrade', 'lawsuit', 'fraud', 'restructuring', 'crisis', 'investigation', 'scandal', 'debt']
+# One alternation over all keywords; like `keyword in title`, it matches inside longer words too.
+NEGATIVE_KEYWORDS_PATTERN = re.compile("|".join(map(re.escape, NEGATIVE_KEYWORDS)))
+
+# Compound scores never change for a given headline, so entries only leave by LRU eviction.
+sentiment_cache = TTLCache(maxsize=SENTIMENT_CACHE_SIZE, ttl=float('inf'), name="sentiment")
+_sia, _sia_lock = None, threading.Lock()
+
+def get_sentiment_analyzer():
+    """Builds the VADER analyzer on first use from the lexicon under NLTK_DATA_DIR.
+
+    nltk is imported here rather than at module import; the lexicon is downloaded into
+    NLTK_DATA_DIR only if it was not bundled there.
+    """
+    global _sia
+    if _sia is None:
+        with _sia_lock:
+            if _sia is None:
+                import nltk
+                from nltk.sentiment.vader import SentimentIntensityAnalyzer
+                if NLTK_DATA_DIR and NLTK_DATA_DIR not in nltk.data.path: nltk.data.path.insert(0, NLTK_DATA_DIR)
+                try: _sia = SentimentIntensityAnalyzer()
+                except LookupError:
+                    logging.warning(f"VADER lexicon not bundled in {NLTK_DATA_DIR}; downloading it."); nltk.download('vader_lexicon', download_dir=NLTK_DATA_DIR or None, quiet=True); _sia = SentimentIntensityAnalyzer()
+    return _sia
+
+def headline_key(text: str) -> str:
+    """Cache key for a headline. Only whitespace is normalized, since VADER reads case and punctuation."""
+    return hashlib.blake2b(" ".join(text.split()).encode('utf-8'), digest_size=16).hexdigest()
+
+def score_titles(titles: list) -> list:
+    """Returns VADER compound scores for `titles`, scoring each distinct uncached headline once."""
+    keys = [headline_key(title) if title and isinstance(title, str) else None for title in titles]
+    scores = {key: sentiment_cache.get(key) for key in set(keys) if key is not None}
+    missing = {key: title for key, title in zip(keys, titles) if key is not None and scores[key] is None}
+    if missing:
+        analyzer = get_sentiment_analyzer()
+        for key, title in missing.items():
+            scores[key] = analyzer.polarity_scores(title)['compound']; sentiment_cache.set(key, scores[key])
+    return [scores[key] if key is not None else 0.0 for key in keys]
+
+def get_sentiment(text: str):
+    return score_titles([text])[0]
+
+def get_news_features(news_data: list):
+    """Returns (avg_news_sentiment_30d, news_volume_30d, negative_event_count) for a list of articles."""
+    avg_sentiment, news_volume, negative_event_count = 0.0, 0, 0
+    if news_data:
+        news_volume = len(news_data)
+        sentiments = score_titles([article.get('title') for article in news_data if article.get('title')])
+        if sentiments: avg_sentiment = np.mean(sentiments)
+        negative_event_count = sum(1 for article in news_data if NEGATIVE_KEYWORDS_PATTERN.search((article.get('title') or '').lower()))
+    return avg_sentiment, news_volume, negative_event_count
@@ -0,0 +1,86 @@
+# backend/services/serialization.py
+
+import gzip
+import json
+import datetime
+import numpy as np
+import pandas as pd
+from starlette.responses import Response
+from .config import RESPONSE_COMPRESSION_MIN_BYTES
+from .metrics import time_stage
+
+try: import orjson
+except ImportError: orjson = None
+try: import zstandard
+except ImportError: zstandard = None
+
+RESPONSE_FORMATS = ("index", "columnar")
+
+def _default(obj):
+    if isinstance(obj, np.generic): return obj.item()
+    if isinstance(obj, np.ndarray): return obj.tolist()
+    if isinstance(obj, (datetime.datetime, datetime.date)): return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def dumps(payload) -> bytes:
+    """Encodes a payload with orjson when it is installed, falling back to the stdlib encoder."""
+    if orjson is not None: return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_default, separators=(",", ":")).encode()
+
+def loads(body):
+    """Decodes JSON produced by dumps."""
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+def build_score_payload(ticker: str, yf_data: dict, result: dict, news_data: list, degraded_inputs: list = ()) -> dict:
+    """The /api/v1/score payload for a scored ticker, before field selection and table shaping."""
+    company_info = yf_data.get("info", {})
+    return {"ticker": ticker.upper(), "company_name": company_info.get("longName", ticker), "company_info": company_info, "score_result": result, "stock_history": yf_data.get("historical_data"), "recent_news_for_context": news_data[:5] if news_data else [], "degraded_inputs": list(degraded_inputs)}
+
+def shape_frame(table, response_format: str = "index"):
+    """Renders a DataFrame or date-keyed dict-of-dicts as {date: row} ("index") or {"index": [...], "columns": {...}} ("columnar")."""
+    if isinstance(table, pd.DataFrame):
+        index = [key.isoformat() if isinstance(key, datetime.date) else str(key) for key in table.index]
+        if response_format == "columnar": return {"index": index, "columns": {column: table[column].tolist() for column in table.columns}}
+        return dict(zip(index, table.to_dict(orient="records")))
+    if not table or response_format != "columnar": return table
+    rows = list(table.values())
+    return {"index": list(table.keys()), "columns": {column: [row.get(column) for row in rows] for column in rows[0]}}
+
+def select_fields(payload: dict, fields: str = None) -> dict:
+    """Applies a `fields=` selector such as "ticker,score_result.stability_score" or "-score_result.all_features".
+
+    Plain names keep only those (top-level or one dotted level deep); names starting with "-" drop them.
+    """
+    if not fields: return payload
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    include = [name.split(".", 1) for name in names if not name.startswith("-")]
+    exclude = [name[1:].split(".", 1) for name in names if name.startswith("-")]
+    if include:
+        selected = {}
+        for path in include:
+            if path[0] not in payload: continue
+            if len(path) == 1: selected[path[0]] = payload[path[0]]
+            elif isinstance(payload[path[0]], dict) and path[1] in payload[path[0]]: selected.setdefault(path[0], {})[path[1]] = payload[path[0]][path[1]]
+        payload = selected
+    for path in exclude:
+        if len(path) == 1: payload.pop(path[0], None)
+        elif isinstance(payload.get(path[0]), dict): payload[path[0]] = {key: value for key, value in payload[path[0]].items() if key != path[1]}
+    return payload
+
+def render_response(payload: dict, accept_encoding: str = "", fields: str = None, response_format: str = "index", status_code: int = 200) -> Response:
+    """Selects fields, reshapes date-keyed tables, encodes JSON and compresses it (zstd or gzip) if the client accepts it."""
+    payload = select_fields(dict(payload), fields)
+    if "stock_history" in payload: payload["stock_history"] = shape_frame(payload["stock_history"], response_format)
+    if isinstance(payload.get("score_result"), dict) and "all_features" in payload["score_result"]:
+        payload["score_result"] = {**payload["score_result"], "all_features": shape_frame(payload["score_result"]["all_features"], response_format)}
+    with time_stage("serialize"): body = dumps(payload)
+    headers = {"Vary": "Accept-Encoding"}
+    if len(body) >= RESPONSE_COMPRESSION_MIN_BYTES:
+        accepted = {token.split(";")[0].strip().lower() for token in (accept_encoding or "").split(",")}
+        if "zstd" in accepted and zstandard is not None:
+            with time_stage("compress"): body = zstandard.ZstdCompressor(level=3).compress(body)
+            headers["Content-Encoding"] = "zstd"
+        elif "gzip" in accepted:
+            with time_stage("compress"): body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
@@ -0,0 +1,126 @@
+# backend/services/snapshot_store.py
+
+import os
+import time
+import sqlite3
+import threading
+import logging
+from .serialization import dumps, loads
+from .metrics import cache_requests
+from .scoring_engine import FEATURE_COLUMNS
+
+# Numeric columns of the screening table: score components plus the latest engineer_features row.
+SCREEN_COLUMNS = ["stability_score", "technical_score", "fundamental_score", "risk_probability", "market_cap"] + FEATURE_COLUMNS
+SCREEN_INDEXED_COLUMNS = ["stability_score", "technical_score", "risk_probability", "market_cap", "debt_to_equity", "trailingPE"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS score_snapshots (
+    ticker TEXT PRIMARY KEY,
+    company_name TEXT,
+    sector TEXT,
+    market_cap REAL,
+    stability_score INTEGER,
+    technical_score INTEGER,
+    fundamental_score INTEGER,
+    assessment_type TEXT,
+    model_scope TEXT,
+    data_date TEXT,
+    scored_at REAL NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS screening (
+    ticker TEXT PRIMARY KEY,
+    company_name TEXT,
+    sector TEXT,
+    assessment_type TEXT,
+    scored_at REAL NOT NULL,
+    %s
+);
+CREATE INDEX IF NOT EXISTS screening_sector ON screening (sector, stability_score);
+%s
+""" % (",\n    ".join(f'"{column}" REAL' for column in SCREEN_COLUMNS), "\n".join(f'CREATE INDEX IF NOT EXISTS "screening_{column}" ON screening ("{column}");' for column in SCREEN_INDEXED_COLUMNS))
+
+def _as_int(value):
+    return int(value) if isinstance(value, (int, float)) else None
+
+def _as_float(value):
+    return float(value) if isinstance(value, (int, float)) else None
+
+# Fundamentals engineer_features zero-fills, screened on the raw company info instead so missing values stay NULL.
+SCREEN_INFO_COLUMNS = {"trailingPE": "trailingPE", "debt_to_equity": "debtToEquity", "cash_per_share": "totalCashPerShare"}
+
+def _screening_row(payload: dict, scored_at: float) -> tuple:
+    result, info = payload.get("score_result") or {}, payload.get("company_info") or {}
+    features = result.get("all_features") or {}
+    latest = features[max(features)] if features else {}
+    values = {"stability_score": result.get("stability_score"), "technical_score": result.get("technical_score"), "fundamental_score": result.get("fundamental_score"), "risk_probability": result.get("risk_probability"), "market_cap": info.get("marketCap"), **latest,
+              **{column: info.get(key) for column, key in SCREEN_INFO_COLUMNS.items()}}
+    return (payload["ticker"].upper(), payload.get("company_name"), info.get("sector"), result.get("assessment_type"), scored_at, *(_as_float(values.get(column)) for column in SCREEN_COLUMNS))
+
+class SnapshotStore:
+    """Precomputed /api/v1/score payloads in SQLite, one row per ticker keyed by its primary key.
+
+    Reads are a single indexed lookup. The database runs in WAL mode so the API keeps reading
+    while the nightly job writes, and each thread uses its own connection.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path): os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn: conn.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL"); conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def get(self, ticker: str, max_age: float = None):
+        """Returns {"payload", "scored_at", "data_date"} for a ticker, or None if it has no snapshot younger than `max_age` seconds."""
+        row = self._connection().execute("SELECT payload, scored_at, data_date FROM score_snapshots WHERE ticker = ?", (ticker.upper(),)).fetchone()
+        if row is None or (max_age and time.time() - row[1] > max_age):
+            cache_requests.inc(cache="snapshots", result="miss"); return None
+        cache_requests.inc(cache="snapshots", result="hit")
+        return {"payload": loads(row[0]), "scored_at": row[1], "data_date": row[2]}
+
+    def put_many(self, payloads: list, scored_at: float = None) -> int:
+        """Upserts score payloads (as built by build_score_payload, with tables already shaped) and their screening rows in one transaction."""
+        scored_at = scored_at or time.time(); rows = []
+        for payload in payloads:
+            result, info = payload.get("score_result") or {}, payload.get("company_info") or {}
+            history = payload.get("stock_history") or {}
+            rows.append((payload["ticker"].upper(), payload.get("company_name"), info.get("sector"), info.get("marketCap"), _as_int(result.get("stability_score")), _as_int(result.get("technical_score")), _as_int(result.get("fundamental_score")),
+                         result.get("assessment_type"), result.get("model_scope"), max(history) if history else None, scored_at, dumps(payload)))
+        with self._connection() as conn:
+            conn.executemany("INSERT OR REPLACE INTO score_snapshots VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.executemany(f"INSERT OR REPLACE INTO screening VALUES ({', '.join('?' * (5 + len(SCREEN_COLUMNS)))})", [_screening_row(payload, scored_at) for payload in payloads])
+        logging.info(f"Stored {len(rows)} score snapshots in {self.path}."); return len(rows)
+
+    def delete(self, ticker: str):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM score_snapshots WHERE ticker = ?", (ticker.upper(),)); conn.execute("DELETE FROM screening WHERE ticker = ?", (ticker.upper(),))
+
+    def screen(self, sectors: list = None, ranges: dict = None, sort: str = "stability_score", descending: bool = False, limit: int = 50, offset: int = 0, max_age: float = None):
+        """Filters the screening table in SQL; returns (total_matches, rows as dicts) for one page.
+
+        `ranges` maps a SCREEN_COLUMNS name to (min, max), either bound None for open-ended; rows with
+        a NULL in a filtered column never match. `sort` must be a SCREEN_COLUMNS name or "ticker".
+        """
+        clauses, params = [], []
+        if sectors:
+            clauses.append(f"sector IN ({', '.join('?' * len(sectors))})"); params += list(sectors)
+        for column, (low, high) in (ranges or {}).items():
+            if column not in SCREEN_COLUMNS: raise ValueError(f"Unknown screening column '{column}'.")
+            if low is not None: clauses.append(f'"{column}" >= ?'); params.append(low)
+            if high is not None: clauses.append(f'"{column}" <= ?'); params.append(high)
+        if max_age: clauses.append("scored_at >= ?"); params.append(time.time() - max_age)
+        if sort not in SCREEN_COLUMNS and sort != "ticker": raise ValueError(f"Unknown sort column '{sort}'.")
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        conn = self._connection()
+        total = conn.execute(f"SELECT COUNT(*) FROM screening{where}", params).fetchone()[0]
+        # NULLs sort last either way, so unscored names never crowd out a top-k page.
+        cursor = conn.execute(f'SELECT * FROM screening{where} ORDER BY "{sort}" IS NULL, "{sort}" {"DESC" if descending else "ASC"}, ticker LIMIT ? OFFSET ?', params + [limit, offset])
+        names = [description[0] for description in cursor.description]
+        return total, [dict(zip(names, row)) for row in cursor.fetchall()]
@@ -0,0 +1,162 @@
+# backend/services/training_jobs.py
+
+import os
+import queue
+import threading
+import time
+import uuid
+import logging
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from .config import TRAINING_WORKERS, TRAINING_JOB_HISTORY, RETRAIN_MIN_INTERVAL_SECONDS, RETRAIN_MAX_MODEL_AGE_SECONDS, RETRAIN_MAX_PENDING, TRAINING_PROCESSES, TRAINING_THREADS_PER_JOB
+from .metrics import training_job_seconds, training_queue_depth
+
+_training_pool = None
+_training_pool_lock = threading.Lock()
+
+def _init_training_process(threads_per_job: int):
+    # Cap native thread pools so N training processes cannot oversubscribe the API host's cores.
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"): os.environ[var] = str(threads_per_job)
+
+def get_training_pool() -> ProcessPoolExecutor:
+    """Returns the process pool used for model fits, creating it on first use."""
+    global _training_pool
+    with _training_pool_lock:
+        if _training_pool is None:
+            # spawn, not fork: the API process is multi-threaded and forking it can deadlock.
+            _training_pool = ProcessPoolExecutor(max_workers=TRAINING_PROCESSES, mp_context=multiprocessing.get_context("spawn"), initializer=_init_training_process, initargs=(TRAINING_THREADS_PER_JOB,))
+        return _training_pool
+
+def run_in_training_pool(func, *args, **kwargs):
+    """Runs `func` in a training process and waits for its (picklable) result."""
+    global _training_pool
+    pool = get_training_pool()
+    try:
+        return pool.submit(func, *args, **kwargs).result()
+    except BrokenProcessPool:
+        # A crashed child (e.g. OOM) poisons the pool; drop it so the next job starts a fresh one.
+        with _training_pool_lock:
+            if _training_pool is pool: _training_pool = None
+        raise
+
+class TrainingJobQueue:
+    """Background training queue served by a fixed pool of worker threads.
+
+    At most one job per ticker is queued or running at a time; submitting again while one is
+    pending returns the existing job. Finished jobs are kept (up to `max_history`) so clients
+    can poll their status.
+    """
+
+    def __init__(self, workers: int = 2, max_history: int = 1000):
+        self.workers, self.max_history = workers, max_history
+        self._queue = queue.Queue()
+        self._jobs = OrderedDict()  # job_id -> job record
+        self._active_by_ticker = {}  # ticker -> job_id of its queued or running job
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, ticker: str, target, *args, **kwargs) -> dict:
+        """Queues `target(*args, **kwargs)` for `ticker` unless a job for it is already pending."""
+        ticker = ticker.upper()
+        with self._lock:
+            active_id = self._active_by_ticker.get(ticker)
+            if active_id is not None: return dict(self._jobs[active_id])
+            job = {"job_id": uuid.uuid4().hex, "ticker": ticker, "status": "queued", "created_at": time.time(), "started_at": None, "finished_at": None, "error": None}
+            self._jobs[job["job_id"]] = job; self._active_by_ticker[ticker] = job["job_id"]
+            self._trim_history(); self._ensure_workers()
+            self._queue.put((job, target, args, kwargs))
+        logging.info(f"Queued training job {job['job_id']} for {ticker}.")
+        return dict(job)
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def active_job(self, ticker: str):
+        with self._lock:
+            job_id = self._active_by_ticker.get(ticker.upper())
+            return dict(self._jobs[job_id]) if job_id is not None else None
+
+    def join(self):
+        """Blocks until every job queued so far has finished."""
+        self._queue.join()
+
+    def depth(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return self._queue.qsize()
+
+    def pending(self) -> int:
+        """Number of jobs queued or running."""
+        with self._lock: return len(self._active_by_ticker)
+
+    def _ensure_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, daemon=True, name=f"training-worker-{len(self._threads)}")
+            self._threads.append(thread); thread.start()
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["finished_at"] is not None]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_history)]: del self._jobs[job_id]
+
+    def _work(self):
+        while True:
+            job, target, args, kwargs = self._queue.get()
+            with self._lock: job["status"] = "running"; job["started_at"] = time.time()
+            status, error = "succeeded", None
+            try:
+                if target(*args, **kwargs) is None: status, error = "failed", "Training produced no model."
+            except Exception as e:
+                logging.error(f"Training job {job['job_id']} for {job['ticker']} raised: {e}")
+                status, error = "failed", str(e)
+            with self._lock:
+                job["status"], job["error"], job["finished_at"] = status, error, time.time()
+                self._active_by_ticker.pop(job["ticker"], None)
+            training_job_seconds.observe(job["finished_at"] - job["started_at"], status=status)
+            logging.info(f"Training job {job['job_id']} for {job['ticker']} {status} in {job['finished_at'] - job['started_at']:.1f}s.")
+            self._queue.task_done()
+
+class RetrainScheduler:
+    """Staleness-based retraining policy in front of a TrainingJobQueue.
+
+    A ticker is retrained only when its model file is older than `max_model_age` seconds or
+    price data newer than the model has arrived, and at most once per `min_interval` seconds.
+    The queue supplies single-flight per ticker and the global concurrency cap (its worker
+    count); retrains are skipped while more than `max_pending` jobs are already waiting.
+    """
+
+    def __init__(self, job_queue: TrainingJobQueue, min_interval: float, max_model_age: float, max_pending: int):
+        self.job_queue, self.min_interval, self.max_model_age, self.max_pending = job_queue, min_interval, max_model_age, max_pending
+        self._last_scheduled = {}  # ticker -> time.time() of the last retrain handed to the queue
+        self._scheduled_data_date = {}  # ticker -> latest data date ('YYYY-MM-DD') covered by that retrain
+        self._lock = threading.Lock()
+
+    def is_due(self, ticker: str, model_path: str, data_date: str = None) -> bool:
+        ticker = ticker.upper(); now = time.time()
+        with self._lock:
+            last = self._last_scheduled.get(ticker)
+            covered_through = self._scheduled_data_date.get(ticker)
+        if last is not None and now - last < self.min_interval: return False
+        try: model_mtime = os.path.getmtime(model_path)
+        except OSError: return True
+        if now - model_mtime > self.max_model_age: return True
+        # A model written on or after a bar's date has already seen that bar.
+        covered_through = max(covered_through or "", datetime.fromtimestamp(model_mtime).strftime('%Y-%m-%d'))
+        return data_date is not None and data_date > covered_through
+
+    def maybe_schedule(self, ticker: str, model_path: str, data_date: str, target, *args, **kwargs):
+        """Queues `target` if the ticker's model is due for retraining; returns the job or None."""
+        if not self.is_due(ticker, model_path, data_date): return None
+        if self.job_queue.depth() >= self.max_pending:
+            logging.warning(f"Training queue is full ({self.job_queue.depth()} pending); skipping retrain of {ticker}."); return None
+        with self._lock:
+            self._last_scheduled[ticker.upper()] = time.time()
+            if data_date is not None: self._scheduled_data_date[ticker.upper()] = data_date
+        return self.job_queue.submit(ticker, target, *args, **kwargs)
+
+training_jobs = TrainingJobQueue(workers=TRAINING_WORKERS, max_history=TRAINING_JOB_HISTORY)
+training_queue_depth.set_function(training_jobs.pending)
+retrain_scheduler = RetrainScheduler(training_jobs, min_interval=RETRAIN_MIN_INTERVAL_SECONDS, max_model_age=RETRAIN_MAX_MODEL_AGE_SECONDS, max_pending=RETRAIN_MAX_PENDING)
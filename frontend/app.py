@@ -83,7 +83,8 @@ BACKEND_URL = "https://credit-risk-hackathon-production.up.railway.app/api/v1/sc
 def get_api_data(ticker: str):
     """Fetches analysis data from the backend API."""
     try:
-        response = requests.get(f"{BACKEND_URL}/{ticker}")
+        # The dashboard never reads the per-day feature table, so skip it and take the price history as columns.
+        response = requests.get(f"{BACKEND_URL}/{ticker}", params={"fields": "-score_result.all_features", "format": "columnar"})
         response.raise_for_status()
         return response.json()
 
@@ -192,7 +193,10 @@ if analyze_button:
             with col1:
                 st.subheader("Why this score? (Key Drivers)")
                 if score_result.get('assessment_type') == 'Heuristic':
-                    st.warning("The ML model could not be trained. A qualitative assessment is provided instead.")
+                    if score_result.get('model_status') == 'training':
+                        st.info("The ML model for this ticker is still being trained. A qualitative assessment is provided until it is ready.")
+                    else:
+                        st.warning("The ML model could not be trained. A qualitative assessment is provided instead.")
                     st.subheader("Qualitative Observations")
                     for obs in score_result['explanation']:
                         st.markdown(f"- {obs['feature']}: {obs['value']}")
@@ -221,8 +225,8 @@ if analyze_button:
 
             with col2:
                 st.subheader("Historical Stock Performance (1 Year)")
-                stock_df = pd.DataFrame.from_dict(api_data['stock_history'], orient='index')
-                stock_df.index = pd.to_datetime(stock_df.index)
+                stock_history = api_data['stock_history']
+                stock_df = pd.DataFrame(stock_history['columns'], index=pd.to_datetime(stock_history['index']))
                 fig_stock_chart = px.line(
                     stock_df,
                     y='Close',
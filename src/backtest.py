@@ -0,0 +1,55 @@
+"""
+Walk-forward backtest of historical stability scores
+
+Fetches a universe of tickers, engineers their features once, then retrains on rolling
+windows and scores every later date out of sample. Per-date scores and AUC / Brier metrics
+are written to results/backtest/. Run from the repository root:
+
+    python -m src.backtest AAPL MSFT JPM --years 5
+    python -m src.backtest --tickers-file universe.txt --scope global --step 63 --workers 8
+"""
+
+import argparse
+import asyncio
+import logging
+import pandas as pd
+from backend.services.data_fetcher import get_market_sentiment_data, get_fred_data, prefetch_price_histories
+from backend.services.scoring_engine import build_price_panel, engineer_features_panel
+from backend.services.backtest import run_backtest, backtest_metrics, write_backtest_results, BACKTEST_SCOPES
+from src.train_global_model import fetch_universe
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of historical stability scores.")
+    parser.add_argument('tickers', nargs='*', help="Tickers to backtest")
+    parser.add_argument('--tickers-file', help="File with one ticker per line")
+    parser.add_argument('--years', type=int, default=5, help="Years of price history per ticker (default: 5)")
+    parser.add_argument('--scope', choices=BACKTEST_SCOPES, default="ticker", help="Per-ticker models or one pooled model per window (default: ticker)")
+    parser.add_argument('--train-window', type=int, default=504, help="Training bars per window, 0 for an expanding window (default: 504)")
+    parser.add_argument('--step', type=int, default=21, help="Bars scored by each window's model before retraining (default: 21)")
+    parser.add_argument('--min-train', type=int, default=252, help="Bars of history before the first window (default: 252)")
+    parser.add_argument('--workers', type=int, default=None, help="Parallel training processes (default: all cores)")
+    parser.add_argument('--output-dir', default="results/backtest", help="Where scores.parquet and metrics.json go")
+    parser.add_argument('--no-news', action='store_true', help="Skip NewsAPI; news features are then zero")
+    args = parser.parse_args()
+    tickers = [ticker.upper() for ticker in args.tickers]
+    if args.tickers_file:
+        with open(args.tickers_file) as f: tickers += [line.strip().upper() for line in f if line.strip() and not line.startswith('#')]
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers: parser.error("no tickers given")
+
+    prefetch_price_histories(tickers)
+    yf_data_by_ticker, news_by_ticker = asyncio.run(fetch_universe(tickers, args.years, not args.no_news))
+    logging.info(f"Fetched {len(yf_data_by_ticker)} of {len(tickers)} tickers.")
+    fred_data = get_fred_data(years=args.years)
+    fred_data = fred_data if fred_data is not None else pd.Series(dtype='float64')
+    info_by_ticker = {ticker: yf_data.get('info', {}) for ticker, yf_data in yf_data_by_ticker.items()}
+    panel = engineer_features_panel(build_price_panel(yf_data_by_ticker), get_market_sentiment_data(), fred_data, news_by_ticker, info_by_ticker)
+    scores = run_backtest(panel, info_by_ticker, scope=args.scope, train_window=args.train_window, step=args.step, min_train=args.min_train, workers=args.workers)
+    if scores.empty:
+        raise SystemExit("No window had enough labelled history to train on.")
+    metrics = backtest_metrics(scores)
+    scores_path, metrics_path = write_backtest_results(scores, {**metrics, "scope": args.scope, "train_window": args.train_window, "step": args.step}, args.output_dir)
+    print(f"Out-of-sample AUC {metrics['roc_auc']} over {metrics['rows_evaluated']} scored dates; wrote {scores_path} and {metrics_path}")
+
+if __name__ == "__main__":
+    main()
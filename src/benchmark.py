@@ -0,0 +1,173 @@
+"""
+Micro-benchmarks for the scoring hot path
+
+Times each scoring stage (feature engineering, fundamentals, model load, prediction,
+explanations, serialization and optionally training) on synthetic price histories, and
+drives the per-ticker models in backend/ml_models. Latency percentiles, throughput and
+peak memory go to a JSON file that can be compared against a run from another commit.
+Nothing touches the network. Run from the repository root:
+
+    python -m src.benchmark --days 750 --tickers 200 --output results/benchmarks/after.json
+    python -m src.benchmark --compare results/benchmarks/before.json --fail-above 1.25
+    python -m src.benchmark --train   # adds train_technical_model (slow: a full Optuna search)
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import platform
+import argparse
+import tempfile
+import resource
+import subprocess
+import tracemalloc
+import logging
+import numpy as np
+import pandas as pd
+
+# Training runs must not touch the shared Optuna studies; this has to be set before config is imported.
+os.environ["OPTUNA_STORAGE_URL"] = ""
+
+from backend.services import scoring_engine
+from backend.services.scoring_engine import engineer_features, engineer_features_panel, build_price_panel, update_feature_state, get_fundamental_score, get_profile_features, train_technical_model
+from backend.services.model_artifacts import load_booster, read_manifest, ARTIFACT_SUFFIX, LEGACY_SUFFIX
+from backend.services.model_registry import LoadedModel
+from backend.services.explainer import explain
+from backend.services.serialization import build_score_payload, dumps, shape_frame
+
+SECTORS = ['Technology', 'Financial Services', 'Healthcare', 'Energy', 'Industrials']
+HEADLINES = ["{name} beats quarterly earnings estimates", "{name} faces lawsuit over accounting practices", "Analysts downgrade {name} on weak guidance",
+             "{name} announces share buyback program", "{name} shares steady ahead of investor day", "Regulators open investigation into {name}"]
+
+def synthetic_yf_data(ticker: str, days: int, rng: np.random.Generator) -> dict:
+    """A geometric random walk of `days` business days plus plausible company info, shaped like get_yahoo_finance_data's result."""
+    dates = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=days)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, days)))
+    spread = close * rng.uniform(0.002, 0.02, days)
+    bars = pd.DataFrame({'Open': close + rng.normal(0, 1, days) * spread / 2, 'High': close + spread, 'Low': close - spread, 'Close': close, 'Volume': rng.integers(1e5, 1e7, days), 'Dividends': 0.0, 'Stock Splits': 0.0}, index=dates.strftime('%Y-%m-%d'))
+    info = {'longName': f"{ticker} Corp", 'sector': SECTORS[rng.integers(len(SECTORS))], 'marketCap': float(10 ** rng.uniform(8, 12)), 'trailingPE': float(rng.uniform(-5, 60)), 'dividendYield': float(rng.uniform(0, 0.05)), 'debtToEquity': float(rng.uniform(0, 250)), 'totalCashPerShare': float(rng.uniform(0, 20))}
+    return {"historical_data": bars.to_dict(orient="index"), "info": info}
+
+def synthetic_news(name: str, count: int, rng: np.random.Generator) -> list:
+    dates = pd.Timestamp.now() - pd.to_timedelta(rng.integers(0, 29, count), unit='D')
+    return [{"source": "Synthetic Wire", "title": HEADLINES[i % len(HEADLINES)].format(name=name), "url": "", "publishedAt": date.isoformat(), "content": ""} for i, date in enumerate(dates)]
+
+def synthetic_fred(days: int, rng: np.random.Generator) -> pd.Series:
+    dates = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=days)
+    return pd.Series(4 + np.cumsum(rng.normal(0, 0.03, days)), index=dates)
+
+def measure(fn, repeat: int, items: int = 1) -> dict:
+    """Runs `fn` once under tracemalloc for peak memory (doubling as warm-up), then `repeat` timed runs."""
+    tracemalloc.start()
+    try: fn(); peak = tracemalloc.get_traced_memory()[1]
+    finally: tracemalloc.stop()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter(); fn(); durations.append(time.perf_counter() - start)
+    ms = np.array(durations) * 1000
+    return {"runs": repeat, "items_per_run": items, "p50_ms": float(np.percentile(ms, 50)), "p90_ms": float(np.percentile(ms, 90)), "p99_ms": float(np.percentile(ms, 99)),
+            "mean_ms": float(ms.mean()), "min_ms": float(ms.min()), "max_ms": float(ms.max()), "throughput_per_s": float(items * repeat / ms.sum() * 1000) if ms.sum() else None,
+            "peak_traced_mb": round(peak / 2 ** 20, 3)}
+
+def model_paths(model_dir: str) -> list:
+    """Every servable model in `model_dir`, preferring the native artifact when a ticker has both."""
+    paths = {}
+    for path in sorted(glob.glob(os.path.join(model_dir, f"*{LEGACY_SUFFIX}"))) + sorted(glob.glob(os.path.join(model_dir, f"*{ARTIFACT_SUFFIX}"))):
+        paths[os.path.splitext(path)[0]] = path
+    return list(paths.values())
+
+def git_commit():
+    try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError): return None
+
+def run_benchmarks(days: int, tickers: int, news_per_ticker: int, repeat: int, model_dir: str, train: bool, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    universe = {f"SYN{i:04d}": synthetic_yf_data(f"SYN{i:04d}", days, rng) for i in range(tickers)}
+    news = {ticker: synthetic_news(yf_data['info']['longName'], news_per_ticker, rng) for ticker, yf_data in universe.items()}
+    info_by_ticker = {ticker: yf_data['info'] for ticker, yf_data in universe.items()}
+    fred, market_sentiment = synthetic_fred(days, rng), float(rng.normal(2, 5))
+    ticker = next(iter(universe)); yf_data = universe[ticker]
+    stages = {}
+    def stage(name: str, fn, runs: int = repeat, items: int = 1):
+        logging.info(f"Benchmarking {name}..."); stages[name] = measure(fn, runs, items)
+
+    stage("engineer_features", lambda: engineer_features(yf_data, market_sentiment, fred, news[ticker]), items=days)
+    stage("engineer_features_panel", lambda: engineer_features_panel(build_price_panel(universe), market_sentiment, fred, news, info_by_ticker), runs=max(1, repeat // 10), items=days * tickers)
+    update_feature_state(ticker, yf_data, market_sentiment, fred, news[ticker])  # seeds the state, so the stage times steady-state rescoring
+    stage("incremental_features", lambda: update_feature_state(ticker, yf_data, market_sentiment, fred, news[ticker]))
+    stage("fundamental_score", lambda: get_fundamental_score(yf_data))
+
+    features = engineer_features(yf_data, market_sentiment, fred, news[ticker])
+    latest = features.iloc[-1:].assign(**get_profile_features(yf_data['info']))
+    panel = engineer_features_panel(build_price_panel(universe), market_sentiment, fred, news, info_by_ticker)
+    batch = scoring_engine.add_profile_features(panel.groupby(level='ticker', sort=False).tail(1).droplevel('date'), info_by_ticker)
+    paths = model_paths(model_dir)
+    if paths:
+        stage("model_load", lambda: [load_booster(path) for path in paths], runs=max(1, repeat // 10), items=len(paths))
+        models = [LoadedModel(path, 0, os.path.getsize(path), read_manifest(path)) for path in paths]
+        for model in models: model.booster
+        stage("predict_proba", lambda: [model.predict_proba(latest) for model in models], items=len(models))
+        stage("predict_proba_batch", lambda: [model.predict_proba(batch) for model in models], runs=max(1, repeat // 10), items=len(models) * len(batch))
+        stage("explain_native", lambda: [explain(model, latest[model.feature_names], "native") for model in models], items=len(models))
+        try:
+            import shap  # noqa: F401
+            stage("explain_shap", lambda: [explain(model, latest[model.feature_names], "shap") for model in models], runs=max(1, repeat // 10), items=len(models))
+        except ImportError:
+            logging.warning("shap is not installed; skipping explain_shap.")
+    else:
+        logging.warning(f"No models in {model_dir}; skipping model_load, predict_proba and explain stages.")
+    payload = build_score_payload(ticker, yf_data, {"stability_score": 50, "all_features": shape_frame(features, "index")}, news[ticker])
+    stage("serialize", lambda: dumps(payload))
+    if train:
+        # Trained models go to a scratch directory, never over the served ones.
+        scoring_engine.MODEL_DIR = tempfile.mkdtemp(prefix="benchmark_models_")
+        stage("train_technical_model", lambda: train_technical_model(features.copy(), f"BENCH{time.monotonic_ns()}"), runs=1)
+    return stages
+
+def compare(current: dict, baseline: dict, fail_above: float = None) -> bool:
+    """Prints p50 ratios against a baseline run; returns False if any stage slowed down by more than `fail_above`."""
+    ok = True
+    print(f"{'stage':<26}{'baseline p50 ms':>18}{'current p50 ms':>18}{'ratio':>9}")
+    for name, stats in current["stages"].items():
+        before = baseline.get("stages", {}).get(name)
+        if before is None: print(f"{name:<26}{'-':>18}{stats['p50_ms']:>18.3f}{'new':>9}"); continue
+        ratio = stats['p50_ms'] / before['p50_ms'] if before['p50_ms'] else float('inf')
+        flag = " !" if fail_above and ratio > fail_above else ""
+        ok = ok and not flag
+        print(f"{name:<26}{before['p50_ms']:>18.3f}{stats['p50_ms']:>18.3f}{ratio:>8.2f}x{flag}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the scoring hot path.")
+    parser.add_argument('--days', type=int, default=252, help="Bars per synthetic price history (default: 252)")
+    parser.add_argument('--tickers', type=int, default=50, help="Synthetic tickers for the panel and batch stages (default: 50)")
+    parser.add_argument('--news-per-ticker', type=int, default=20, help="Synthetic headlines per ticker, 0 for none (default: 20)")
+    parser.add_argument('--repeat', type=int, default=50, help="Timed runs per stage; slow stages use a tenth (default: 50)")
+    parser.add_argument('--model-dir', default="backend/ml_models", help="Per-ticker models to drive (default: backend/ml_models)")
+    parser.add_argument('--train', action='store_true', help="Also time train_technical_model, with an in-memory Optuna study")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default="results/benchmarks/latest.json", help="Where the JSON report goes")
+    parser.add_argument('--compare', help="Earlier report to compare p50 latencies against")
+    parser.add_argument('--fail-above', type=float, help="With --compare, exit non-zero if any stage's p50 grew by more than this factor")
+    args = parser.parse_args()
+
+    started = time.time()
+    stages = run_benchmarks(args.days, args.tickers, args.news_per_ticker, args.repeat, args.model_dir, args.train, args.seed)
+    import xgboost
+    report = {"meta": {"commit": git_commit(), "created_at": pd.Timestamp.now(tz='UTC').isoformat(timespec='seconds'), "python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+                       "numpy": np.__version__, "pandas": pd.__version__, "xgboost": xgboost.__version__, "duration_s": round(time.time() - started, 1),
+                       "params": {"days": args.days, "tickers": args.tickers, "news_per_ticker": args.news_per_ticker, "repeat": args.repeat, "seed": args.seed}},
+              # ru_maxrss is in KiB on Linux and bytes on macOS.
+              "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1),
+              "stages": stages}
+    if os.path.dirname(args.output): os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f: json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+    if args.compare:
+        with open(args.compare) as f: baseline = json.load(f)
+        if not compare(report, baseline, args.fail_above): raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Precompute score snapshots for a ticker universe
+
+Scores every ticker in one batch (as POST /api/v1/score/batch does) and writes the full
+/api/v1/score payloads, explanations and feature tables included, to the SQLite snapshot
+store the API reads from (SNAPSHOT_DB_PATH). Schedule it nightly, e.g. from cron after the
+market close. Run from the repository root:
+
+    python -m src.snapshot_scores AAPL MSFT JPM ...
+    python -m src.snapshot_scores --tickers-file universe.txt
+    SNAPSHOT_TICKERS=AAPL,MSFT python -m src.snapshot_scores
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+import pandas as pd
+from backend.services.config import SNAPSHOT_DB_PATH, SNAPSHOT_TICKERS
+from backend.services.data_fetcher import get_market_sentiment_data, get_fred_data, prefetch_price_histories
+from backend.services.scoring_engine import score_batch
+from backend.services.serialization import build_score_payload, shape_frame
+from backend.services.snapshot_store import SnapshotStore
+from backend.services.training_jobs import training_jobs
+from src.train_global_model import fetch_universe
+
+def build_payloads(results: dict, yf_data_by_ticker: dict, news_by_ticker: dict) -> list:
+    """Turns score_batch results into /api/v1/score payloads, dropping tickers that failed to score."""
+    payloads = []
+    for ticker, result in results.items():
+        if "error" in result: continue
+        # Job ids belong to this process, so API clients could not poll them.
+        result.pop("training_job", None); result.pop("model_status", None)
+        result["all_features"] = shape_frame(result["all_features"], "index")
+        payloads.append(build_score_payload(ticker, yf_data_by_ticker[ticker], result, news_by_ticker.get(ticker)))
+    return payloads
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute score snapshots for a ticker universe.")
+    parser.add_argument('tickers', nargs='*', help="Tickers to snapshot (default: SNAPSHOT_TICKERS)")
+    parser.add_argument('--tickers-file', help="File with one ticker per line")
+    parser.add_argument('--db', default=SNAPSHOT_DB_PATH, help=f"Snapshot database (default: {SNAPSHOT_DB_PATH})")
+    parser.add_argument('--no-news', action='store_true', help="Skip NewsAPI; news features are then zero")
+    args = parser.parse_args()
+    tickers = [ticker.upper() for ticker in args.tickers]
+    if args.tickers_file:
+        with open(args.tickers_file) as f: tickers += [line.strip().upper() for line in f if line.strip() and not line.startswith('#')]
+    tickers = list(dict.fromkeys(tickers or SNAPSHOT_TICKERS))
+    if not tickers: parser.error("no tickers given and SNAPSHOT_TICKERS is empty")
+    if not args.db: parser.error("no snapshot database (SNAPSHOT_DB_PATH is empty)")
+
+    started = time.time()
+    prefetch_price_histories(tickers)
+    yf_data_by_ticker, news_by_ticker = asyncio.run(fetch_universe(tickers, 1, not args.no_news))
+    yf_data_by_ticker = {ticker: yf_data for ticker, yf_data in yf_data_by_ticker.items() if yf_data.get('info')}
+    logging.info(f"Fetched {len(yf_data_by_ticker)} of {len(tickers)} tickers.")
+    fred_data = get_fred_data()
+    fred_data = fred_data if fred_data is not None else pd.Series(dtype='float64')
+    market_sentiment = get_market_sentiment_data()
+    results = score_batch(yf_data_by_ticker, market_sentiment, fred_data, news_by_ticker, include_features=True)
+    training = {ticker: result["training_job"]["job_id"] for ticker, result in results.items() if result.get("model_status") == "training"}
+    store = SnapshotStore(args.db)
+    payloads = build_payloads(results, yf_data_by_ticker, news_by_ticker)
+    store.put_many(payloads, scored_at=started)
+    print(f"Stored {len(payloads)} of {len(tickers)} snapshots in {args.db} in {time.time() - started:.0f}s")
+    if training:
+        # Those snapshots are heuristic stand-ins; once their models exist, score the tickers again so the
+        # API does not serve the heuristic result for a whole snapshot lifetime.
+        logging.info(f"Waiting for cold-start training of {len(training)} tickers queued by this run...")
+        training_jobs.join()
+        trained = [ticker for ticker, job_id in training.items() if (training_jobs.get(job_id) or {}).get("status") == "succeeded"]
+        if trained:
+            results = score_batch({ticker: yf_data_by_ticker[ticker] for ticker in trained}, market_sentiment, fred_data, news_by_ticker, include_features=True)
+            payloads = build_payloads(results, yf_data_by_ticker, news_by_ticker)
+            store.put_many(payloads, scored_at=started)
+            print(f"Re-scored {len(payloads)} newly trained tickers in {time.time() - started:.0f}s")
+    elif training_jobs.pending():
+        logging.info("Waiting for model retraining queued by this run...")
+        training_jobs.join()
+
+if __name__ == "__main__":
+    main()
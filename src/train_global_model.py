@@ -0,0 +1,56 @@
+"""
+Train the pooled cross-sectional scoring model
+
+Fetches a universe of tickers, stacks their engineered features into one panel and
+trains a single XGBoost model on it (saved as backend/ml_models/xgb_scorer_global.ubj plus its manifest).
+With MODEL_MODE=auto or global the API scores every ticker with it, so new tickers need
+no cold-start training. Run from the repository root:
+
+    python -m src.train_global_model AAPL MSFT JPM ...
+    python -m src.train_global_model --tickers-file universe.txt --years 5
+"""
+
+import argparse
+import asyncio
+import logging
+import pandas as pd
+from backend.services.data_fetcher import get_yahoo_finance_data, get_news_data, get_market_sentiment_data, get_fred_data, prefetch_price_histories, run_blocking
+from backend.services.scoring_engine import build_price_panel, engineer_features_panel, train_global_model, get_model_path, GLOBAL_MODEL_KEY
+
+async def fetch_universe(tickers: list, years: int, with_news: bool):
+    """Fetches price history, company info and (optionally) news for every ticker on the shared fetch pool."""
+    yf_results = await asyncio.gather(*(run_blocking(get_yahoo_finance_data, ticker, years) for ticker in tickers))
+    yf_data_by_ticker = {ticker: yf_data for ticker, yf_data in zip(tickers, yf_results) if yf_data and yf_data.get('historical_data')}
+    news_by_ticker = {}
+    if with_news:
+        queries = {ticker: yf_data['info'].get('longName') or ticker for ticker, yf_data in yf_data_by_ticker.items()}
+        news_results = await asyncio.gather(*(run_blocking(get_news_data, query, source="newsapi") for query in queries.values()))
+        news_by_ticker = {ticker: news or [] for ticker, news in zip(queries, news_results)}
+    return yf_data_by_ticker, news_by_ticker
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the pooled cross-sectional scoring model.")
+    parser.add_argument('tickers', nargs='*', help="Tickers in the training universe")
+    parser.add_argument('--tickers-file', help="File with one ticker per line")
+    parser.add_argument('--years', type=int, default=5, help="Years of price history per ticker (default: 5)")
+    parser.add_argument('--no-news', action='store_true', help="Skip NewsAPI; news features are then zero")
+    args = parser.parse_args()
+    tickers = [ticker.upper() for ticker in args.tickers]
+    if args.tickers_file:
+        with open(args.tickers_file) as f: tickers += [line.strip().upper() for line in f if line.strip() and not line.startswith('#')]
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers: parser.error("no tickers given")
+
+    prefetch_price_histories(tickers)
+    yf_data_by_ticker, news_by_ticker = asyncio.run(fetch_universe(tickers, args.years, not args.no_news))
+    logging.info(f"Fetched {len(yf_data_by_ticker)} of {len(tickers)} tickers.")
+    fred_data = get_fred_data(years=args.years)
+    fred_data = fred_data if fred_data is not None else pd.Series(dtype='float64')
+    info_by_ticker = {ticker: yf_data.get('info', {}) for ticker, yf_data in yf_data_by_ticker.items()}
+    panel = engineer_features_panel(build_price_panel(yf_data_by_ticker), get_market_sentiment_data(), fred_data, news_by_ticker, info_by_ticker)
+    if train_global_model(panel, info_by_ticker) is None:
+        raise SystemExit("Global model training failed.")
+    print(f"Global model saved to {get_model_path(GLOBAL_MODEL_KEY)}")
+
+if __name__ == "__main__":
+    main()
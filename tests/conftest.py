@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def synthetic_yf_data(ticker: str, days: int, rng: np.random.Generator) -> dict:
+    """A geometric random walk of `days` business days plus company info, shaped like get_yahoo_finance_data's result."""
+    dates = pd.bdate_range(end="2024-06-28", periods=days)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, days)))
+    bars = pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close, "Volume": 1e6}, index=dates.strftime("%Y-%m-%d"))
+    info = {"longName": f"{ticker} Corp", "sector": "Technology", "marketCap": 5e10, "trailingPE": float(rng.uniform(5, 40)), "dividendYield": 0.01, "debtToEquity": float(rng.uniform(0, 200)), "totalCashPerShare": 3.0}
+    return {"historical_data": bars.to_dict(orient="index"), "info": info}
+
+
+def synthetic_fred(days: int, rng: np.random.Generator) -> pd.Series:
+    """Daily treasury readings with gaps, so forward-filling is exercised."""
+    dates = pd.bdate_range(end="2024-06-28", periods=days)
+    series = pd.Series(4 + np.cumsum(rng.normal(0, 0.03, days)), index=dates)
+    return series.drop(series.index[::7])
+
+
+@pytest.fixture
+def universe():
+    rng = np.random.default_rng(7)
+    return {ticker: synthetic_yf_data(ticker, 400, rng) for ticker in ("AAA", "BBB", "CCC")}, synthetic_fred(420, rng)
@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("optuna")
+pytest.importorskip("xgboost")
+pytest.importorskip("sklearn")
+
+from backend.services import scoring_engine
+
+
+@pytest.fixture
+def trained_models(universe, tmp_path, monkeypatch):
+    """Trains small per-ticker models into a scratch model directory, with in-memory studies and no feature-state carry-over."""
+    monkeypatch.setattr(scoring_engine, "OPTUNA_STORAGE_URL", "")
+    monkeypatch.setattr(scoring_engine, "MODEL_DIR", str(tmp_path))
+    monkeypatch.setattr(scoring_engine, "MODEL_MODE", "ticker")
+    monkeypatch.setattr(scoring_engine, "OPTUNA_TRIALS", 2)
+    monkeypatch.setattr(scoring_engine, "feature_states", scoring_engine.TTLCache(maxsize=10, ttl=float("inf")))
+    yf_data_by_ticker, fred = universe
+    for ticker in ("AAA", "BBB"):
+        assert scoring_engine.train_technical_model(scoring_engine.engineer_features(yf_data_by_ticker[ticker], 1.5, fred, None), ticker) is not None
+    return {ticker: yf_data_by_ticker[ticker] for ticker in ("AAA", "BBB")}, fred
+
+
+@pytest.mark.parametrize("include_features", [False, True])
+def test_batch_scores_match_single_ticker_scores(trained_models, include_features):
+    yf_data_by_ticker, fred = trained_models
+    batch = scoring_engine.score_batch(yf_data_by_ticker, 1.5, fred, None, include_features=include_features)
+    for ticker, yf_data in yf_data_by_ticker.items():
+        single = scoring_engine.get_score_and_explanation(ticker, yf_data, 1.5, fred, None)
+        assert batch[ticker]["model_scope"] == single["model_scope"] == "ticker"
+        assert batch[ticker]["risk_probability"] == pytest.approx(single["risk_probability"], abs=1e-6)
+        for key in ("stability_score", "technical_score", "fundamental_score", "assessment_type"):
+            assert batch[ticker][key] == single[key]
+        assert [item["feature"] for item in batch[ticker]["explanation"]] == [item["feature"] for item in single["explanation"]]
+        assert ("all_features" in batch[ticker]) == include_features
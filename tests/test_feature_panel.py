@@ -0,0 +1,21 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("xgboost")
+
+from backend.services.scoring_engine import engineer_features, engineer_features_panel, build_price_panel
+
+
+def test_panel_matches_per_ticker_features(universe):
+    yf_data_by_ticker, fred = universe
+    panel = engineer_features_panel(build_price_panel(yf_data_by_ticker), 2.5, fred, info_by_ticker={ticker: yf_data["info"] for ticker, yf_data in yf_data_by_ticker.items()})
+    for ticker, yf_data in yf_data_by_ticker.items():
+        expected = engineer_features(yf_data, 2.5, fred, None)
+        pd.testing.assert_frame_equal(panel.xs(ticker).rename_axis(None), expected, check_freq=False, check_names=False, rtol=1e-9)
+
+
+def test_panel_without_fred(universe):
+    yf_data_by_ticker, _ = universe
+    panel = engineer_features_panel(build_price_panel(yf_data_by_ticker), 0.0, None)
+    assert (panel["treasury_rate_change_30d"] == 0).all()
+    pd.testing.assert_frame_equal(panel.xs("AAA").rename_axis(None), engineer_features({"historical_data": yf_data_by_ticker["AAA"]["historical_data"]}, 0.0, None, None), check_freq=False, check_names=False, check_dtype=False, rtol=1e-9)
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("xgboost")
+
+from backend.services import scoring_engine
+from backend.services.scoring_engine import engineer_features, update_feature_state, IncrementalFeatureState
+
+
+def assert_latest_row_matches(row: pd.DataFrame, yf_data: dict, fred: pd.Series):
+    expected = engineer_features(yf_data, 1.5, fred, None).iloc[-1]
+    assert row.index[0] == expected.name
+    np.testing.assert_allclose(row.iloc[0].to_numpy(), expected.to_numpy(), rtol=1e-9, atol=1e-9)
+
+
+def test_seeded_state_matches_batch_path(universe):
+    yf_data_by_ticker, fred = universe
+    state = IncrementalFeatureState.from_history(yf_data_by_ticker["AAA"], 1.5, fred, None)
+    assert_latest_row_matches(state.latest_features(), yf_data_by_ticker["AAA"], fred)
+
+
+def test_new_and_replaced_bars_match_batch_path(universe, monkeypatch):
+    monkeypatch.setattr(scoring_engine, "feature_states", scoring_engine.TTLCache(maxsize=10, ttl=float("inf")))
+    yf_data_by_ticker, fred = universe
+    yf_data = {**yf_data_by_ticker["BBB"], "historical_data": dict(yf_data_by_ticker["BBB"]["historical_data"])}
+    update_feature_state("BBB", yf_data, 1.5, fred, None)
+    history = yf_data["historical_data"]
+    for step in range(5):
+        last = max(history)
+        if step % 2:  # an intraday update of the latest bar
+            history[last] = {**history[last], "Close": history[last]["Close"] * 1.003}
+        else:
+            new_date = (pd.Timestamp(last) + pd.offsets.BDay()).strftime("%Y-%m-%d")
+            history[new_date] = {**history[last], "Close": history[last]["Close"] * 0.98}
+            fred = pd.concat([fred, pd.Series([fred.iloc[-1] + 0.05], index=[pd.Timestamp(new_date)])])
+        assert_latest_row_matches(update_feature_state("BBB", yf_data, 1.5, fred, None), yf_data, fred)
+
+
+def test_readjusted_history_reseeds_state(universe, monkeypatch):
+    monkeypatch.setattr(scoring_engine, "feature_states", scoring_engine.TTLCache(maxsize=10, ttl=float("inf")))
+    yf_data_by_ticker, fred = universe
+    yf_data = yf_data_by_ticker["CCC"]
+    update_feature_state("CCC", yf_data, 1.5, fred, None)
+    split = {**yf_data, "historical_data": {date: {**bar, "Close": bar["Close"] / 10} for date, bar in yf_data["historical_data"].items()}}
+    assert_latest_row_matches(update_feature_state("CCC", split, 1.5, fred, None), split, fred)
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("optuna")
+pytest.importorskip("xgboost")
+pytest.importorskip("sklearn")
+
+from backend.services import scoring_engine
+
+
+@pytest.fixture
+def journal_study(tmp_path, monkeypatch):
+    """Points the training code at a fresh journal file and a scratch model directory, with a short search."""
+    monkeypatch.setattr(scoring_engine, "OPTUNA_STORAGE_URL", f"journal:{tmp_path / 'optuna_studies.journal'}")
+    monkeypatch.setattr(scoring_engine, "_study_storage", None)
+    monkeypatch.setattr(scoring_engine, "MODEL_DIR", str(tmp_path))
+    monkeypatch.setattr(scoring_engine, "OPTUNA_TRIALS", 4)
+    monkeypatch.setattr(scoring_engine, "OPTUNA_WARM_START_TRIALS", 3)
+    monkeypatch.setattr(scoring_engine, "OPTUNA_N_JOBS", 2)
+
+
+def synthetic_training_set(seed: int, rows: int = 400):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(rows, len(scoring_engine.TECHNICAL_FEATURE_COLUMNS))), columns=scoring_engine.TECHNICAL_FEATURE_COLUMNS)
+    y = pd.Series((X.iloc[:, 0] + rng.normal(scale=0.5, size=rows) > 0.8).astype(int))
+    return X, y
+
+
+def test_back_to_back_warm_start_retrains(journal_study):
+    for round_ in range(3):
+        X, y = synthetic_training_set(round_)
+        assert scoring_engine.fit_and_save_model(X, y, "WARM") is not None
+    study = scoring_engine.load_study("WARM")
+    # One cold search and two warm starts (the re-run of the previous best counts as one of their trials).
+    assert len(study.trials) == scoring_engine.OPTUNA_TRIALS + 2 * scoring_engine.OPTUNA_WARM_START_TRIALS
+    assert all(t.state.name in ("COMPLETE", "PRUNED") for t in study.trials)